@@ -0,0 +1,49 @@
+"""
+Micro-benchmark: per-call client overhead with and without the parsed document cache.
+
+The network is replaced by a no-op client, so the numbers show only what the library
+itself spends on building and parsing a query.
+
+Usage (from the repository root): PYTHONPATH=. python benchmarks/bench_document_cache.py [calls]
+"""
+import sys
+import timeit
+
+from datahub_edp_lib import DataHubGraphql, _parse_query
+
+
+class _NoopClient:
+    def execute(self, document, variable_values=None):
+        return {}
+
+
+def _cold(call):
+    def run():
+        _parse_query.cache_clear()
+        call()
+
+    return run
+
+
+def main(calls: int = 2000):
+    datahub = DataHubGraphql('http://localhost:8080/api/graphql', 'token')
+    datahub.client = _NoopClient()
+
+    cases = {
+        'get_dataset_fields': lambda: datahub.get_dataset_fields('orders'),
+        '_get_dataset_tags': lambda: datahub._get_dataset_tags('urn:li:dataset:1'),
+        'get_kafka_topics': lambda: datahub.get_kafka_topics('PROD'),
+        'add_tag': lambda: datahub.add_tag('urn:li:tag:pii', 'urn:li:dataset:1'),
+        'add_field_tag': lambda: datahub.add_field_tag('urn:li:tag:pii', 'urn:li:dataset:1', 'email'),
+    }
+
+    print('%-20s %12s %12s %8s' % ('operation', 'parse, us', 'cached, us', 'speedup'))
+    for name, call in cases.items():
+        cold = timeit.timeit(_cold(call), number=calls) / calls * 1e6
+        call()
+        warm = timeit.timeit(call, number=calls) / calls * 1e6
+        print('%-20s %12.1f %12.1f %7.0fx' % (name, cold, warm, cold / warm))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
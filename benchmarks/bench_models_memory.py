@@ -0,0 +1,49 @@
+"""
+Micro-benchmark: memory held by a large dataset listing as decoded JSON dicts and as Dataset records.
+
+Entities are synthetic search results with a schema and tags, decoded from JSON text the way
+the transport does, so repeated strings are not shared unless the records intern them.
+
+Usage (from the repository root): PYTHONPATH=. python benchmarks/bench_models_memory.py [entities] [fields]
+"""
+import json
+import sys
+import tracemalloc
+
+from datahub_edp_lib.models import Dataset
+
+
+def _entity(i: int, fields: int) -> dict:
+    return {
+        'urn': 'urn:li:dataset:(urn:li:dataPlatform:kafka,topic_%d,PROD)' % i,
+        'type': 'DATASET',
+        'properties': {'name': 'topic_%d' % i},
+        'editableProperties': {'description': 'Topic number %d' % i},
+        'schemaMetadata': {'fields': [{'fieldPath': 'field_%d' % field} for field in range(fields)]},
+        'tags': {'tags': [{'tag': {'urn': 'urn:li:tag:pii', 'name': 'pii'}}]},
+    }
+
+
+def _measure(build) -> int:
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return size
+
+
+def main(entities: int = 20000, fields: int = 10):
+    body = json.dumps([_entity(i, fields) for i in range(entities)])
+
+    as_dicts = _measure(lambda: json.loads(body))
+    as_records = _measure(lambda: [Dataset.from_entity(entity) for entity in json.loads(body)])
+
+    print('%-10s %14s %14s' % ('layout', 'total, MiB', 'per entity, B'))
+    for name, size in (('dicts', as_dicts), ('records', as_records)):
+        print('%-10s %14.1f %14.0f' % (name, size / 2**20, size / entities))
+    print('records take %.0f%% of the dicts memory' % (as_records / as_dicts * 100))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
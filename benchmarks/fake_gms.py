@@ -0,0 +1,782 @@
+"""
+In-process stand-in for the GMS GraphQL endpoint, used by the benchmark suite.
+
+An aiohttp app serves a subset of the DataHub GraphQL schema with graphql-core over a synthetic
+catalog: datasets with fields and tags spread over a tree of containers, kafka topics among them.
+Every request waits `latency` seconds before it is executed, to model network and server time.
+
+    with FakeGMS(datasets=10000, fields=20, latency=0.005) as gms:
+        datahub = DataHubGraphql(gms.url, 'token')
+"""
+
+import asyncio
+import json
+import threading
+from typing import Dict, List, Optional
+
+from aiohttp import web
+from graphql import build_schema, graphql_sync
+
+SCHEMA = """
+enum EntityType { DATASET CONTAINER TAG DATA_PLATFORM }
+enum SubResourceType { DATASET_FIELD }
+enum SortOrder { ASCENDING DESCENDING }
+enum FilterOperator { EQUAL CONTAIN GREATER_THAN LESS_THAN }
+enum LineageDirection { UPSTREAM DOWNSTREAM }
+
+interface Entity {
+  urn: String!
+  type: EntityType!
+}
+
+interface EntityWithRelationships {
+  urn: String!
+  type: EntityType!
+  lineage(input: LineageInput!): EntityLineageResult
+}
+
+type LineageRelationship {
+  type: String!
+  entity: Entity
+  degree: Int
+}
+
+type EntityLineageResult {
+  start: Int
+  count: Int
+  total: Int
+  relationships: [LineageRelationship!]!
+}
+
+type IngestionSchedule {
+  interval: String!
+  timezone: String
+}
+
+type IngestionConfig {
+  recipe: String!
+  executorId: String!
+  version: String
+}
+
+type IngestionSource {
+  urn: String!
+  name: String!
+  type: String!
+  schedule: IngestionSchedule
+  platform: DataPlatform
+  config: IngestionConfig!
+}
+
+type ListIngestionSourcesResult {
+  start: Int
+  count: Int
+  total: Int
+  ingestionSources: [IngestionSource!]!
+}
+
+type TagProperties {
+  name: String!
+  description: String
+}
+
+type Tag implements Entity {
+  urn: String!
+  type: EntityType!
+  name: String!
+  description: String
+  properties: TagProperties
+}
+
+type TagAssociation {
+  tag: Tag!
+  associatedUrn: String
+}
+
+type GlobalTags {
+  tags: [TagAssociation!]
+}
+
+type DataPlatformProperties {
+  displayName: String
+}
+
+type DataPlatform implements Entity {
+  urn: String!
+  type: EntityType!
+  name: String!
+  properties: DataPlatformProperties
+}
+
+type SchemaField {
+  fieldPath: String!
+}
+
+type SchemaMetadata {
+  name: String
+  fields: [SchemaField!]!
+}
+
+type CustomPropertiesEntry {
+  key: String!
+  value: String
+  associatedUrn: String!
+}
+
+type DatasetProperties {
+  name: String!
+  customProperties: [CustomPropertiesEntry!]
+}
+
+type EditableProperties {
+  description: String
+}
+
+type Dataset implements Entity & EntityWithRelationships {
+  urn: String!
+  type: EntityType!
+  name: String!
+  lineage(input: LineageInput!): EntityLineageResult
+  platform: DataPlatform!
+  properties: DatasetProperties
+  editableProperties: EditableProperties
+  schemaMetadata: SchemaMetadata
+  tags: GlobalTags
+}
+
+type ContainerProperties {
+  name: String!
+}
+
+type Container implements Entity {
+  urn: String!
+  type: EntityType!
+  platform: DataPlatform!
+  properties: ContainerProperties
+  editableProperties: EditableProperties
+  entities(input: ContainerEntitiesInput): SearchResults
+}
+
+type SearchResult {
+  entity: Entity!
+}
+
+type SearchResults {
+  start: Int
+  count: Int
+  total: Int
+  searchResults: [SearchResult!]!
+}
+
+type SearchAcrossLineageResult {
+  entity: Entity!
+  degree: Int!
+}
+
+type SearchAcrossLineageResults {
+  start: Int
+  count: Int
+  total: Int
+  searchResults: [SearchAcrossLineageResult!]!
+}
+
+type ScrollResults {
+  nextScrollId: String
+  count: Int
+  total: Int
+  searchResults: [SearchResult!]!
+}
+
+input ContainerEntitiesInput {
+  query: String
+  start: Int
+  count: Int
+}
+
+input LineageInput {
+  direction: LineageDirection!
+  start: Int
+  count: Int
+}
+
+input FacetFilterInput {
+  field: String!
+  value: String
+  values: [String!]
+  condition: FilterOperator
+  negated: Boolean
+}
+
+input AndFilterInput {
+  and: [FacetFilterInput!]
+}
+
+input SortCriterion {
+  field: String!
+  sortOrder: SortOrder!
+}
+
+input SearchSortInput {
+  sortCriterion: SortCriterion
+}
+
+input SearchInput {
+  type: EntityType!
+  query: String!
+  start: Int
+  count: Int
+  orFilters: [AndFilterInput!]
+}
+
+input SearchAcrossEntitiesInput {
+  types: [EntityType!]
+  query: String!
+  start: Int
+  count: Int
+  filters: [FacetFilterInput!]
+  orFilters: [AndFilterInput!]
+}
+
+input ScrollAcrossEntitiesInput {
+  types: [EntityType!]
+  query: String!
+  count: Int
+  scrollId: String
+  keepAlive: String
+  orFilters: [AndFilterInput!]
+  sortInput: SearchSortInput
+}
+
+input SearchAcrossLineageInput {
+  urn: String
+  direction: LineageDirection!
+  types: [EntityType!]
+  query: String
+  start: Int
+  count: Int
+  orFilters: [AndFilterInput!]
+}
+
+input ListIngestionSourcesInput {
+  start: Int
+  count: Int
+  query: String
+}
+
+input UpdateIngestionSourceScheduleInput {
+  interval: String!
+  timezone: String!
+}
+
+input UpdateIngestionSourceConfigInput {
+  recipe: String!
+  version: String
+  executorId: String!
+}
+
+input UpdateIngestionSourceInput {
+  name: String!
+  type: String!
+  description: String
+  schedule: UpdateIngestionSourceScheduleInput
+  config: UpdateIngestionSourceConfigInput!
+}
+
+input ResourceRefInput {
+  resourceUrn: String!
+  subResourceType: SubResourceType
+  subResource: String
+}
+
+input BatchAddTagsInput {
+  tagUrns: [String!]!
+  resources: [ResourceRefInput!]!
+}
+
+input BatchRemoveTagsInput {
+  tagUrns: [String!]!
+  resources: [ResourceRefInput!]!
+}
+
+input TagAssociationInput {
+  tagUrns: [String!]!
+  resourceUrn: String!
+  subResourceType: SubResourceType
+  subResource: String
+}
+
+input CreateTagInput {
+  id: String
+  name: String!
+  description: String
+}
+
+input DescriptionUpdateInput {
+  description: String!
+  resourceUrn: String!
+}
+
+input DatasetEditablePropertiesUpdate {
+  description: String!
+}
+
+input DatasetUpdateInput {
+  editableProperties: DatasetEditablePropertiesUpdate
+}
+
+type Query {
+  entity(urn: String!): Entity
+  dataset(urn: String!): Dataset
+  container(urn: String!): Container
+  tag(urn: String!): Tag
+  search(input: SearchInput!): SearchResults
+  searchAcrossEntities(input: SearchAcrossEntitiesInput!): SearchResults
+  scrollAcrossEntities(input: ScrollAcrossEntitiesInput!): ScrollResults
+  searchAcrossLineage(input: SearchAcrossLineageInput!): SearchAcrossLineageResults
+  listIngestionSources(input: ListIngestionSourcesInput!): ListIngestionSourcesResult
+}
+
+type Mutation {
+  createTag(input: CreateTagInput!): String
+  addTags(input: TagAssociationInput!): Boolean
+  batchAddTags(input: BatchAddTagsInput!): Boolean
+  batchRemoveTags(input: BatchRemoveTagsInput!): Boolean
+  updateDescription(input: DescriptionUpdateInput!): Boolean
+  updateDataset(urn: String!, input: DatasetUpdateInput!): Dataset
+  createIngestionSource(input: UpdateIngestionSourceInput!): String
+  updateIngestionSource(urn: String!, input: UpdateIngestionSourceInput!): String
+}
+"""
+
+
+def _platform(name: str) -> dict:
+    return {
+        '__typename': 'DataPlatform',
+        'urn': 'urn:li:dataPlatform:' + name,
+        'type': 'DATA_PLATFORM',
+        'name': name,
+        'properties': {'displayName': name},
+    }
+
+
+class Catalog:
+    """
+    Synthetic catalog: `datasets` datasets with `fields` fields and `tags_per_dataset` tags each,
+    every `kafka_every`-th one a kafka topic, spread over `containers` containers forming a tree
+    with `branching` children per container. Dataset i feeds datasets i * lineage_fanout + 1 ...
+    i * lineage_fanout + lineage_fanout and the first child of dataset i + 1, so lineage is a DAG
+    with shared nodes. `ingestion_sources` postgres ingestion sources are scheduled daily.
+    """
+
+    def __init__(
+        self,
+        datasets: int = 10000,
+        fields: int = 20,
+        containers: int = 100,
+        branching: int = 10,
+        tags: int = 50,
+        tags_per_dataset: int = 2,
+        kafka_every: int = 5,
+        lineage_fanout: int = 2,
+        ingestion_sources: int = 200,
+    ):
+        self.tags: Dict[str, dict] = {}
+        for i in range(tags):
+            self.put_tag('tag_%d' % i, 'Synthetic tag %d' % i)
+        tag_urns = list(self.tags)
+        self.field_tags: Dict[tuple, set] = {}
+        self.containers: Dict[str, dict] = {}
+        self.children: Dict[str, List[dict]] = {}
+        for i in range(containers):
+            urn = 'urn:li:container:container_%d' % i
+            parent = 'urn:li:container:container_%d' % ((i - 1) // branching) if i else None
+            self.containers[urn] = {
+                '__typename': 'Container',
+                'urn': urn,
+                'type': 'CONTAINER',
+                'platform': _platform('hive'),
+                'properties': {'name': 'container_%d' % i},
+                'editableProperties': {'description': None},
+                'container': parent,
+                'entities': self._container_entities(urn),
+            }
+            if parent is not None:
+                self.children.setdefault(parent, []).append(self.containers[urn])
+
+        self.datasets: Dict[str, dict] = {}
+        container_urns = list(self.containers) or [None]
+        for i in range(datasets):
+            platform = 'kafka' if kafka_every and i % kafka_every == 0 else 'hive'
+            name = 'db_%d.table_%d' % (i % 97, i)
+            urn = 'urn:li:dataset:(urn:li:dataPlatform:%s,%s,PROD)' % (platform, name)
+            dataset = {
+                '__typename': 'Dataset',
+                'urn': urn,
+                'type': 'DATASET',
+                'name': name,
+                'platform': _platform(platform),
+                'properties': {'name': name, 'customProperties': []},
+                'editableProperties': {'description': None},
+                'schemaMetadata': {'name': name, 'fields': [{'fieldPath': 'column_%d' % j} for j in range(fields)]},
+                'tags': {
+                    'tags': [
+                        {'tag': self.tags[tag_urns[(i + j) % len(tag_urns)]], 'associatedUrn': urn}
+                        for j in range(min(tags_per_dataset, len(tag_urns)))
+                    ]
+                },
+                'container': container_urns[i % len(container_urns)],
+                'origin': 'PROD',
+                'lastOperationTime': 1700000000000 + i,
+                'lineage': self._lineage(urn),
+            }
+            self.datasets[urn] = dataset
+            if dataset['container'] is not None:
+                self.children.setdefault(dataset['container'], []).append(dataset)
+        self.ordered = list(self.datasets.values())
+
+        self.lineage: Dict[str, Dict[str, List[str]]] = {'DOWNSTREAM': {}, 'UPSTREAM': {}}
+        for i, dataset in enumerate(self.ordered):
+            first = i * lineage_fanout + 1
+            targets = set(range(first, first + lineage_fanout)) | {first + lineage_fanout} if lineage_fanout else set()
+            for target in sorted(target for target in targets if target < len(self.ordered)):
+                self.lineage['DOWNSTREAM'].setdefault(dataset['urn'], []).append(self.ordered[target]['urn'])
+                self.lineage['UPSTREAM'].setdefault(self.ordered[target]['urn'], []).append(dataset['urn'])
+
+        self.ingestion_sources: Dict[str, dict] = {}
+        for i in range(ingestion_sources):
+            recipe = {
+                'source': {
+                    'type': 'postgres',
+                    'config': {'host_port': 'db_%d:5432' % i, 'database': 'db_%d' % i, 'password': 'secret_%d' % i},
+                },
+                'sink': {'type': 'datahub-rest'},
+            }
+            self.put_ingestion_source(
+                'urn:li:dataHubIngestionSource:source_%d' % i,
+                {
+                    'name': 'source_%d' % i,
+                    'type': 'postgres',
+                    'schedule': {'interval': '%d 3 * * *' % (i % 60), 'timezone': 'UTC'},
+                    'config': {'recipe': json.dumps(recipe), 'executorId': 'default', 'version': None},
+                },
+            )
+
+    def put_tag(self, name: str, description: str = None) -> str:
+        urn = 'urn:li:tag:' + name
+        self.tags[urn] = {
+            '__typename': 'Tag',
+            'urn': urn,
+            'type': 'TAG',
+            'name': name,
+            'description': description,
+            'properties': {'name': name, 'description': description},
+        }
+        return urn
+
+    def put_ingestion_source(self, urn: str, source_input: dict):
+        self.ingestion_sources[urn] = {
+            'urn': urn,
+            'name': source_input['name'],
+            'type': source_input['type'],
+            'schedule': source_input.get('schedule'),
+            'platform': _platform(source_input['type']),
+            'config': dict(source_input['config']),
+        }
+
+    def entity(self, urn: str) -> Optional[dict]:
+        return self.datasets.get(urn) or self.containers.get(urn) or self.tags.get(urn)
+
+    def search(self, types, query: str, filters=None, or_filters=None, sort=None) -> List[dict]:
+        if types is not None and not isinstance(types, list):
+            types = [types]
+        pools = []
+        if types is None or 'DATASET' in types:
+            pools.append(self.ordered)
+        if types is None or 'CONTAINER' in types:
+            pools.append(list(self.containers.values()))
+        matches = []
+        for pool in pools:
+            for entity in pool:
+                if query not in ('', '*') and query not in entity.get('name', entity['urn']):
+                    continue
+                if filters and not all(_matches(entity, facet) for facet in filters):
+                    continue
+                if or_filters and not any(
+                    all(_matches(entity, facet) for facet in group['and']) for group in or_filters
+                ):
+                    continue
+                matches.append(entity)
+        if sort and sort.get('sortCriterion'):
+            criterion = sort['sortCriterion']
+            matches.sort(
+                key=lambda entity: entity.get(criterion['field']) or 0, reverse=criterion['sortOrder'] == 'DESCENDING'
+            )
+        return matches
+
+    def reachable(self, urn: str, direction: str) -> Dict[str, int]:
+        """
+        :return: Degree of every entity reachable from urn in the direction
+        """
+        degrees, frontier = {}, [urn]
+        for degree in range(1, len(self.datasets) + 1):
+            frontier = [
+                target
+                for source in frontier
+                for target in self.lineage[direction].get(source, ())
+                if target not in degrees and target != urn
+            ]
+            if not frontier:
+                break
+            for target in frontier:
+                degrees.setdefault(target, degree)
+        return degrees
+
+    def _lineage(self, urn: str):
+        def resolve(info, data):
+            targets = [self.datasets[target] for target in self.lineage[data['direction']].get(urn, ())]
+            start = data.get('start') or 0
+            stop = start + (data.get('count') or 100)
+            return {
+                'start': start,
+                'count': len(targets[start:stop]),
+                'total': len(targets),
+                'relationships': [
+                    {'type': 'DownstreamOf', 'entity': target, 'degree': 1} for target in targets[start:stop]
+                ],
+            }
+
+        return resolve
+
+    def _container_entities(self, urn: str):
+        def resolve(info, data=None):
+            data = data or {}
+            entities = self.children.get(urn, [])
+            return _page(entities, data.get('start') or 0, data.get('count') or 20)
+
+        return resolve
+
+
+def _matches(entity: dict, facet: dict) -> bool:
+    value = entity.get(facet['field'])
+    if isinstance(value, dict):
+        value = value.get('urn')
+    values = facet.get('values') or [facet.get('value')]
+    condition = facet.get('condition') or 'EQUAL'
+    if condition == 'GREATER_THAN':
+        matched = value is not None and float(value) > float(values[0])
+    elif condition == 'LESS_THAN':
+        matched = value is not None and float(value) < float(values[0])
+    elif condition == 'CONTAIN':
+        matched = value is not None and any(str(item) in str(value) for item in values)
+    else:
+        matched = value in values
+    return matched != bool(facet.get('negated'))
+
+
+def _resolve(source, info, **args):
+    """
+    Default field resolver of graphql-core, passing the `input` argument as `data`
+    """
+    value = source.get(info.field_name) if isinstance(source, dict) else getattr(source, info.field_name, None)
+    if callable(value):
+        if 'input' in args:
+            args['data'] = args.pop('input')
+        return value(info, **args)
+    return value
+
+
+def _page(entities: List[dict], start: int, count: int) -> dict:
+    stop = start + count
+    return {
+        'start': start,
+        'count': count,
+        'total': len(entities),
+        'searchResults': [{'entity': entity} for entity in entities[start:stop]],
+    }
+
+
+class Root:
+    """
+    Root resolvers of the schema subset over a catalog
+    """
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+
+    def entity(self, info, urn):
+        return self.catalog.entity(urn)
+
+    def dataset(self, info, urn):
+        return self.catalog.datasets.get(urn)
+
+    def container(self, info, urn):
+        return self.catalog.containers.get(urn)
+
+    def tag(self, info, urn):
+        return self.catalog.tags.get(urn)
+
+    def search(self, info, data):
+        matches = self.catalog.search([data['type']], data['query'], or_filters=data.get('orFilters'))
+        return _page(matches, data.get('start') or 0, data.get('count') or 10)
+
+    def searchAcrossEntities(self, info, data):
+        matches = self.catalog.search(data.get('types'), data['query'], data.get('filters'), data.get('orFilters'))
+        return _page(matches, data.get('start') or 0, data.get('count') or 10)
+
+    def scrollAcrossEntities(self, info, data):
+        matches = self.catalog.search(
+            data.get('types'), data['query'], or_filters=data.get('orFilters'), sort=data.get('sortInput')
+        )
+        start = int(data.get('scrollId') or 0)
+        page = _page(matches, start, data.get('count') or 10)
+        end = start + len(page['searchResults'])
+        page['nextScrollId'] = str(end) if end < len(matches) else None
+        return page
+
+    def searchAcrossLineage(self, info, data):
+        degrees = self.catalog.reachable(data['urn'], data['direction'])
+        allowed = None
+        for group in data.get('orFilters') or ():
+            for facet in group['and']:
+                if facet['field'] == 'degree':
+                    allowed = set(facet.get('values') or [facet.get('value')])
+        results = [
+            {'entity': self.catalog.datasets[urn], 'degree': degree}
+            for urn, degree in degrees.items()
+            if allowed is None or str(degree) in allowed or (degree >= 3 and '3+' in allowed)
+        ]
+        start = data.get('start') or 0
+        stop = start + (data.get('count') or 10)
+        return {
+            'start': start,
+            'count': len(results[start:stop]),
+            'total': len(results),
+            'searchResults': results[start:stop],
+        }
+
+    def listIngestionSources(self, info, data):
+        sources = list(self.catalog.ingestion_sources.values())
+        start = data.get('start') or 0
+        stop = start + (data.get('count') or 20)
+        return {
+            'start': start,
+            'count': len(sources[start:stop]),
+            'total': len(sources),
+            'ingestionSources': sources[start:stop],
+        }
+
+    def createIngestionSource(self, info, data):
+        urn = 'urn:li:dataHubIngestionSource:created_%d' % len(self.catalog.ingestion_sources)
+        self.catalog.put_ingestion_source(urn, data)
+        return urn
+
+    def updateIngestionSource(self, info, urn, data):
+        if urn not in self.catalog.ingestion_sources:
+            raise ValueError('Ingestion source %s does not exist' % urn)
+        self.catalog.put_ingestion_source(urn, data)
+        return urn
+
+    def createTag(self, info, data):
+        return self.catalog.put_tag(data.get('id') or data['name'], data.get('description'))
+
+    def addTags(self, info, data):
+        return self._tag([{'resourceUrn': data['resourceUrn'], 'subResource': data.get('subResource')}], data, True)
+
+    def batchAddTags(self, info, data):
+        return self._tag(data['resources'], data, True)
+
+    def batchRemoveTags(self, info, data):
+        return self._tag(data['resources'], data, False)
+
+    def updateDescription(self, info, data):
+        entity = self.catalog.entity(data['resourceUrn'])
+        if entity is None:
+            raise ValueError('Entity %s does not exist' % data['resourceUrn'])
+        entity['editableProperties'] = {'description': data['description']}
+        return True
+
+    def updateDataset(self, info, urn, data):
+        dataset = self.catalog.datasets[urn]
+        dataset['editableProperties'] = dict(data['editableProperties'])
+        return dataset
+
+    def _tag(self, resources: List[dict], data: dict, add: bool) -> bool:
+        tags = [self.catalog.tags[urn] for urn in data['tagUrns']]
+        for resource in resources:
+            dataset = self.catalog.datasets[resource['resourceUrn']]
+            if resource.get('subResource'):
+                current = self.catalog.field_tags.setdefault((dataset['urn'], resource['subResource']), set())
+                for tag in tags:
+                    (current.add if add else current.discard)(tag['urn'])
+                continue
+            associations = [item for item in dataset['tags']['tags'] if item['tag'] not in tags]
+            if add:
+                associations += [{'tag': tag, 'associatedUrn': dataset['urn']} for tag in tags]
+            dataset['tags'] = {'tags': associations}
+        return True
+
+
+class FakeGMS:
+    """
+    Fake GMS running on an event loop of its own thread
+    """
+
+    def __init__(self, latency: float = 0.0, catalog: Catalog = None, **catalog_options):
+        """
+        :param latency: Seconds every request waits before it is executed
+        :param catalog: Catalog to serve, built from catalog_options by default
+        :param catalog_options: Catalog arguments
+        """
+        self.latency = latency
+        self.catalog = catalog if catalog is not None else Catalog(**catalog_options)
+        self.schema = build_schema(SCHEMA)
+        self.root = Root(self.catalog)
+        self.requests = 0
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self) -> 'FakeGMS':
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def _serve(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/api/graphql', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = 'http://127.0.0.1:%d/api/graphql' % port
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        result = graphql_sync(
+            self.schema,
+            payload['query'],
+            root_value=self.root,
+            variable_values=payload.get('variables'),
+            operation_name=payload.get('operationName'),
+            field_resolver=_resolve,
+        )
+        body = {'data': result.data}
+        if result.errors:
+            body['errors'] = [error.formatted for error in result.errors]
+        return web.json_response(body, dumps=json.dumps)
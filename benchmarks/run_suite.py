@@ -0,0 +1,267 @@
+"""
+Benchmark suite: throughput and latency of DataHubGraphql against the in-process fake GMS.
+
+Every case runs a workload `repeat` times on a fresh catalog served by benchmarks/fake_gms.py and
+reports the best wall time, items per second, the number of requests and the per-request latency
+percentiles collected with a metrics hook. Results are saved as JSON and can be compared with a
+previous run.
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/run_suite.py --datasets 5000 --latency 0.005 --output results.json
+    PYTHONPATH=. python benchmarks/run_suite.py --baseline results.json [--cases pagination_prefetch ...]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from fake_gms import FakeGMS
+
+from datahub_edp_lib import DataHubGraphql, Projection
+
+
+class _Latencies:
+    def __init__(self):
+        self.samples: List[float] = []
+
+    def __call__(self, event):
+        if not event.cached:
+            self.samples.append(event.latency)
+
+    def percentile(self, share: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def _urns(gms: FakeGMS, count: int) -> List[str]:
+    return [dataset['urn'] for dataset in gms.catalog.ordered[:count]]
+
+
+def _pagination_sequential(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    return sum(1 for _ in datahub.iter_dataset_fields('*', page_size=options.page_size, prefetch=1))
+
+
+def _pagination_prefetch(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    return sum(1 for _ in datahub.iter_dataset_fields('*', page_size=options.page_size, prefetch=options.workers))
+
+
+def _pagination_scroll(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    return sum(1 for _ in datahub.scroll_datasets(batch_size=options.page_size))
+
+
+def _fields_full(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    page = datahub.get_dataset_fields('*', count=options.page_size)
+    return len(page['searchAcrossEntities']['searchResults'])
+
+
+def _fields_projected(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    page = datahub.get_dataset_fields('*', count=options.page_size, projection=Projection('display_name'))
+    return len(page['searchAcrossEntities']['searchResults'])
+
+
+def _tags_sequential(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    for urn in _urns(gms, options.items):
+        datahub._get_dataset_tags(urn)
+    return options.items
+
+
+def _tags_batched(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    return len(datahub._get_datasets_tags(_urns(gms, options.items), workers=options.workers))
+
+
+def _tag_names(gms: FakeGMS, count: int) -> List[Tuple[str, str]]:
+    # Every existing tag first, then new ones
+    names = [tag['name'] for tag in gms.catalog.tags.values()][:count]
+    names += ['benchmark_tag_%d' % i for i in range(count - len(names))]
+    return [(name, 'Benchmark tag') for name in names]
+
+
+def _ensure_tags_sequential(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    for name, description in _tag_names(gms, options.items):
+        if not datahub.search_for_tag('urn:li:tag:' + name)['tag']:
+            datahub.create_tag(name, description)
+    return options.items
+
+
+def _ensure_tags_batched(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    return len(datahub.ensure_tags(_tag_names(gms, options.items), workers=options.workers))
+
+
+def _field_tagging_sequential(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    for urn in _urns(gms, options.items):
+        datahub.add_field_tag('urn:li:tag:tag_0', urn, 'column_0')
+    return options.items
+
+
+def _field_tagging_batched(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    triples = [(urn, 'column_0', ['urn:li:tag:tag_0']) for urn in _urns(gms, options.items)]
+    return sum(datahub.batch_add_field_tags(triples, workers=options.workers))
+
+
+def _descriptions_sequential(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    for urn in _urns(gms, options.items):
+        datahub._update_dataset_description(urn, 'Benchmark description')
+    return options.items
+
+
+def _descriptions_batched(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    descriptions = {urn: 'Benchmark description' for urn in _urns(gms, options.items)}
+    return sum(datahub.update_descriptions(descriptions, workers=options.workers).values())
+
+
+def _lineage_sequential(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    # One lineage request per entity and hop, the way ad-hoc single queries walk the graph
+    frontier, visited = _urns(gms, options.items // 10), set()
+    for _ in range(5):
+        next_level = []
+        for urn in frontier:
+            page = datahub.get_entity_lineage(urn, 'DOWNSTREAM', 0, options.page_size)['entity']['lineage']
+            for relationship in page['relationships']:
+                if relationship['entity']['urn'] not in visited:
+                    visited.add(relationship['entity']['urn'])
+                    next_level.append(relationship['entity']['urn'])
+        frontier = next_level
+    return len(visited)
+
+
+def _lineage_batched(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    edges = datahub.iter_lineage(_urns(gms, options.items // 10), max_hops=5, workers=options.workers)
+    return len({neighbour for _, neighbour, _, _ in edges})
+
+
+def _desired_ingestion_sources(gms: FakeGMS, count: int) -> List[dict]:
+    # The full desired state of `count` sources, every fourth one with a new schedule
+    desired = []
+    for i, source in enumerate(list(gms.catalog.ingestion_sources.values())[:count]):
+        schedule = {'interval': '0 4 * * *', 'timezone': 'UTC'} if i % 4 == 0 else source['schedule']
+        config = {key: source['config'][key] for key in ('recipe', 'executorId', 'version')}
+        desired.append(
+            {
+                'urn': source['urn'],
+                'name': source['name'],
+                'type': source['type'],
+                'schedule': schedule,
+                'config': config,
+            }
+        )
+    return desired
+
+
+def _ingestion_sequential(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    # Every source is pushed with its full recipe, changed or not
+    for source in _desired_ingestion_sources(gms, options.items):
+        config = source['config']
+        datahub.update_ingestion_recipe(
+            source['urn'],
+            source['name'],
+            source['type'],
+            source['schedule'],
+            config['executorId'],
+            config['version'],
+            config['recipe'],
+        )
+    return options.items
+
+
+def _ingestion_reconcile(datahub: DataHubGraphql, gms: FakeGMS, options) -> int:
+    desired = _desired_ingestion_sources(gms, options.items)
+    datahub.reconcile_ingestion_sources(desired, workers=options.workers)
+    return len(desired)
+
+
+CASES: Dict[str, Callable] = {
+    'pagination_sequential': _pagination_sequential,
+    'pagination_prefetch': _pagination_prefetch,
+    'pagination_scroll': _pagination_scroll,
+    'fields_full': _fields_full,
+    'fields_projected': _fields_projected,
+    'tags_sequential': _tags_sequential,
+    'tags_batched': _tags_batched,
+    'ensure_tags_sequential': _ensure_tags_sequential,
+    'ensure_tags_batched': _ensure_tags_batched,
+    'field_tagging_sequential': _field_tagging_sequential,
+    'field_tagging_batched': _field_tagging_batched,
+    'descriptions_sequential': _descriptions_sequential,
+    'descriptions_batched': _descriptions_batched,
+    'lineage_sequential': _lineage_sequential,
+    'lineage_batched': _lineage_batched,
+    'ingestion_sequential': _ingestion_sequential,
+    'ingestion_reconcile': _ingestion_reconcile,
+}
+
+
+def run_case(name: str, options) -> dict:
+    best = None
+    for _ in range(options.repeat):
+        with FakeGMS(latency=options.latency, datasets=options.datasets, fields=options.fields) as gms:
+            latencies = _Latencies()
+            with DataHubGraphql(
+                gms.url, 'token', keep_alive=True, pool_size=options.workers, hooks=[latencies]
+            ) as datahub:
+                started = time.perf_counter()
+                items = CASES[name](datahub, gms, options)
+                seconds = time.perf_counter() - started
+            if best is None or seconds < best['seconds']:
+                best = {
+                    'seconds': seconds,
+                    'items': items,
+                    'items_per_second': items / seconds if seconds else 0.0,
+                    'requests': gms.requests,
+                    'latency_p50': latencies.percentile(0.5),
+                    'latency_p95': latencies.percentile(0.95),
+                }
+    return best
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--datasets', type=int, default=5000, help='Datasets in the synthetic catalog')
+    parser.add_argument('--fields', type=int, default=20, help='Fields per dataset')
+    parser.add_argument('--latency', type=float, default=0.005, help='Seconds added to every request')
+    parser.add_argument('--items', type=int, default=200, help='Entities touched by the lookup and mutation cases')
+    parser.add_argument('--page-size', type=int, default=100, help='Entities per page')
+    parser.add_argument('--workers', type=int, default=4, help='Requests in flight for concurrent cases')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case, the fastest one is reported')
+    parser.add_argument('--cases', nargs='*', choices=sorted(CASES), default=list(CASES), help='Cases to run')
+    parser.add_argument('--output', help='Save the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare with the results saved by a previous run')
+    options = parser.parse_args(argv)
+
+    baseline = {}
+    if options.baseline:
+        with open(options.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+
+    results = {}
+    print('%-26s %9s %8s %12s %9s %9s %9s' % ('case', 'seconds', 'items', 'items/s', 'requests', 'p50, ms', 'p95, ms'))
+    for name in options.cases:
+        result = results[name] = run_case(name, options)
+        line = '%-26s %9.3f %8d %12.1f %9d %9.2f %9.2f' % (
+            name,
+            result['seconds'],
+            result['items'],
+            result['items_per_second'],
+            result['requests'],
+            result['latency_p50'] * 1000,
+            result['latency_p95'] * 1000,
+        )
+        if name in baseline and baseline[name]['items_per_second']:
+            line += '  %+6.1f%% vs baseline' % (
+                (result['items_per_second'] / baseline[name]['items_per_second'] - 1) * 100
+            )
+        print(line)
+
+    if options.output:
+        meta = {key: value for key, value in vars(options).items() if key not in ('output', 'baseline')}
+        meta.update(python=sys.version.split()[0], platform=platform.platform(), created=time.time())
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump({'meta': meta, 'results': results}, file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
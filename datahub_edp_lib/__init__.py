@@ -1,14 +1,149 @@
-from typing import List
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import urllib3
 from gql import Client, gql
-from gql.transport.requests import RequestsHTTPTransport
+from graphql import DocumentNode, OperationType, get_operation_ast
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from datahub_edp_lib import batch, ingestion, lineage, models, resilience
+from datahub_edp_lib.cache import ResponseCache, collect_urns
+from datahub_edp_lib.cassette import Cassette
+from datahub_edp_lib.checkpoint import Checkpoint, digest, now_millis
+from datahub_edp_lib.crawl import CrawlStats, child_edges, container_children
+from datahub_edp_lib.limiter import RateLimiter
+from datahub_edp_lib.metrics import OperationEvent, count_rows
+from datahub_edp_lib.projections import Projection, project
+from datahub_edp_lib.snapshot import SnapshotWriter
+from datahub_edp_lib.topics import KafkaTopicIndex
+from datahub_edp_lib.transport import DataHubHTTPTransport, json_codec
+from datahub_edp_lib.writebehind import MutationQueue
 
 urllib3.disable_warnings()
 
+DOCUMENT_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=DOCUMENT_CACHE_SIZE)
+def _parse_query(query: str) -> DocumentNode:
+    """
+    Parse a GraphQL document once and reuse the AST on subsequent calls.
+    Keyed by the final query text, so every %s-templated variant gets its own entry.
+    :param query: GraphQL document source
+    :return: Parsed document
+    """
+    return gql(query)
+
+
+def _search_page(key: str, model: type = None) -> Callable[[dict], Tuple[int, list]]:
+    """
+    Build an extractor of (total, entities) from a search response
+    :param key: Top level field of the response, for e.g. searchAcrossEntities
+    :param model: Record class of datahub_edp_lib.models to build from every entity, None keeps the dicts
+    :return: Extractor
+    """
+
+    def extract(result: dict) -> Tuple[int, list]:
+        page = result[key]
+        entities = [row['entity'] for row in page['searchResults']]
+        return page['total'], entities if model is None else [model.from_entity(entity) for entity in entities]
+
+    return extract
+
+
+def _field_resources(field_tags: List[Tuple[str, str, List[str]]]) -> List[Tuple[dict, List[str]]]:
+    """
+    :param field_tags: (resource_urn, field_path, tag_urns) triples
+    :return: (ResourceRefInput of the dataset field, tag_urns) pairs
+    """
+    return [
+        ({'resourceUrn': resource_urn, 'subResourceType': 'DATASET_FIELD', 'subResource': field_path}, tag_urns)
+        for resource_urn, field_path, tag_urns in field_tags
+    ]
+
+
+def _ingestion_sources_page(typed: bool = False) -> Callable[[dict], Tuple[int, list]]:
+    def extract(page: dict) -> Tuple[int, list]:
+        sources = page['ingestionSources']
+        return page['total'], [models.IngestionSource.from_entity(source) for source in sources] if typed else sources
+
+    return extract
+
 
 class DataHubGraphql:
-    def __init__(self, base_url, token, use_ssl=False):
+    # Upper bound of the estimated request size when packing many operations into one document
+    max_payload_bytes = 512 * 1024
+    # Read operations served from the response cache when one is configured
+    cached_operations = frozenset(
+        {
+            'get_dataset_props',
+            'get_dataset_tags',
+            'get_kafka_topics',
+            'listIngestionSources',
+            'list_container_entities',
+            'list_tag_entities',
+            'search_dataset_fields',
+        }
+    )
+    # Mutations that leave the same state when repeated, retried with the idempotent_mutation policy
+    idempotent_mutations = frozenset(
+        {
+            'UpdateIngestionSourceInput',
+            'add_or_remove_tags',
+            'batch_add_or_remove_field_tags',
+            'updateDataset',
+            'updateDescription',
+            'updateDescriptions',
+            'update_ingestion_sources',
+        }
+    )
+
+    def __init__(
+        self,
+        base_url,
+        token,
+        use_ssl=False,
+        keep_alive=False,
+        pool_size=10,
+        max_retries=0,
+        cache: ResponseCache = None,
+        fast_json=True,
+        limiter: RateLimiter = None,
+        hooks: List[Callable[[OperationEvent], None]] = None,
+        retry_policies: Dict[str, resilience.RetryPolicy] = None,
+        circuit_breaker: resilience.CircuitBreaker = None,
+        cassette: Cassette = None,
+    ):
+        """
+        :param base_url: GMS GraphQL endpoint
+        :param token: Access token generated in the Datahub UI
+        :param use_ssl: Verify the server's TLS certificate
+        :param keep_alive: Connect once and reuse pooled keep-alive connections for all calls
+            instead of opening a new HTTP session per call. Call close() or use the client
+            as a context manager to release the connections.
+        :param pool_size: Number of keep-alive connections kept in the pool
+        :param max_retries: Retries for errors connecting to GMS, when no request has been sent yet.
+            Failed responses are retried by retry_policies, which never resend non-idempotent mutations.
+        :param cache: Response cache for the read operations in cached_operations. Mutations drop the
+            cached responses mentioning the urns they change, mutations without urns clear the cache.
+        :param fast_json: Encode requests and decode responses with orjson when it is installed
+        :param limiter: Rate and adaptive concurrency limiter shared by every call, including concurrent ones
+        :param hooks: Functions called with an OperationEvent after every operation, for e.g. metrics.Metrics.
+            They run on the calling thread and must not raise.
+        :param retry_policies: Retry policies by operation class: "query", "idempotent_mutation" (see
+            idempotent_mutations) and "mutation". By default transient errors of reads and idempotent
+            mutations are retried with exponential backoff and jitter, pass {} to disable retries.
+        :param circuit_breaker: Circuit breaker failing calls fast while GMS is down
+        :param cassette: Cassette recording the exchanges with GMS, or serving the recorded ones
+            instead of GMS for offline runs
+        """
         self.base_url = base_url
         self.token = token
         self.request_header = {
@@ -16,15 +151,385 @@ class DataHubGraphql:
             'Content-Type': 'application/json',
         }
         self.use_ssl = use_ssl
+        self.keep_alive = keep_alive
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.cache = cache
+        self.limiter = limiter
+        self.hooks = list(hooks or ())
+        self.retry_policies = resilience.default_retry_policies() if retry_policies is None else retry_policies
+        self.circuit_breaker = circuit_breaker
+        self._senders = {name: policy.decorate(self._guarded_send) for name, policy in self.retry_policies.items()}
+        # Tag name -> urn of the tags known to exist, filled by ensure_tags
+        self.tag_index: Dict[str, str] = {}
+        # Neighbours of the entities expanded by iter_lineage, reused across traversals
+        self.lineage_cache = lineage.LineageCache()
+        # Kafka topic indexes by environment, created by kafka_topic_index
+        self.kafka_topic_indexes: Dict[str, KafkaTopicIndex] = {}
+        # Buffered tag mutations flushed by close(), created by write_behind
+        self.mutation_queue: Optional[MutationQueue] = None
 
-        self.transport = RequestsHTTPTransport(url=self.base_url, headers=self.request_header, verify=self.use_ssl)
+        self.transport = DataHubHTTPTransport(
+            url=self.base_url,
+            headers=self.request_header,
+            verify=self.use_ssl,
+            fast_json=fast_json,
+            cassette=cassette,
+        )
         self.client = Client(transport=self.transport)
+        self.session = None
 
-    def _get_ingestion_sources(self, start: int = 0, count: int = 100) -> list:
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self) -> 'DataHubGraphql':
+        """
+        Open a persistent HTTP session with a keep-alive connection pool.
+        Subsequent calls reuse it until close() is called.
+        :return: The client itself
+        """
+        if self.session is None:
+            self.session = self.client.connect_sync()
+            adapter = HTTPAdapter(
+                pool_connections=self.pool_size,
+                pool_maxsize=self.pool_size,
+                max_retries=Retry(
+                    total=self.max_retries,
+                    read=0,
+                    backoff_factor=0.1,
+                    # Resending a POST after a 5xx could repeat a committed write, retry_policies handle those
+                    status_forcelist=(),
+                    allowed_methods=None,
+                    raise_on_status=False,
+                ),
+            )
+            for prefix in ('http://', 'https://'):
+                self.transport.session.mount(prefix, adapter)
+        return self
+
+    def close(self):
+        """
+        Flush the write-behind queue, close the persistent HTTP session and its pooled connections
+        """
+        if self.mutation_queue is not None:
+            self.mutation_queue.flush()
+        self._disconnect()
+
+    def _disconnect(self):
+        """
+        Close the persistent HTTP session without flushing the write-behind queue, which may be flushing
+        """
+        if self.session is not None:
+            self.client.close_sync()
+            self.session = None
+
+    def _execute(self, query: Union[str, DocumentNode], variables: dict = None, use_cache: bool = True) -> dict:
+        """
+        Execute a GraphQL operation
+        :param query: GraphQL document source (parsed once and cached) or an already parsed document
+        :param variables: Operation variables
+        :param use_cache: Whether the response cache may serve and store the result of a cached operation
+        :return: Operation result
+        """
+        document = _parse_query(query) if isinstance(query, str) else query
+        cache_key = self._cache_key(document, variables) if use_cache else None
+        if cache_key is not None:
+            result = self.cache.get(cache_key)
+            if result is not None:
+                self._notify(document, variables, 0.0, result, cached=True)
+                return result
+        started = time.perf_counter()
+        try:
+            result = self._sender(document)(document, variables)
+        except Exception as error:
+            self._notify(document, variables, time.perf_counter() - started, error=error)
+            raise
+        finally:
+            self._invalidate_cache(document, variables)
+        self._notify(document, variables, time.perf_counter() - started, result)
+        if cache_key is not None:
+            self.cache.put(cache_key, result, collect_urns(variables) | collect_urns(result))
+        return result
+
+    def _sender(self, document: DocumentNode) -> Callable:
+        """
+        :return: Send function of the operation, retrying it as configured for its operation class
+        """
+        operation = get_operation_ast(document)
+        if operation.operation == OperationType.QUERY:
+            operation_class = resilience.QUERY
+        elif operation.name is not None and operation.name.value in self.idempotent_mutations:
+            operation_class = resilience.IDEMPOTENT_MUTATION
+        else:
+            operation_class = resilience.MUTATION
+        return self._senders.get(operation_class, self._guarded_send)
+
+    def _guarded_send(self, document: DocumentNode, variables: dict = None) -> dict:
+        """
+        Send an operation through the circuit breaker when one is configured
+        """
+        if self.circuit_breaker is None:
+            return self._send(document, variables)
+        self.circuit_breaker.before_call()
+        try:
+            result = self._send(document, variables)
+        except Exception as error:
+            self.circuit_breaker.record(error)
+            raise
+        self.circuit_breaker.record()
+        return result
+
+    def _notify(
+        self,
+        document: DocumentNode,
+        variables: dict,
+        latency: float,
+        result: dict = None,
+        error: BaseException = None,
+        cached: bool = False,
+        rows: int = None,
+    ):
+        """
+        Call the hooks with the event of a finished operation
+        :param rows: Number of returned entities when there is no result to count them in, for e.g. streamed ones
+        """
+        if not self.hooks:
+            return
+        operation = get_operation_ast(document)
+        request_bytes, response_bytes = (None, None) if cached else self._exchange_sizes(document, variables, result)
+        data = getattr(error, 'data', None) if error is not None else result
+        event = OperationEvent(
+            operation.name.value if operation.name is not None else 'anonymous',
+            operation.operation.value,
+            latency,
+            request_bytes,
+            response_bytes,
+            count_rows(data) if rows is None else rows,
+            error,
+            cached,
+        )
+        for hook in self.hooks:
+            hook(event)
+
+    def _exchange_sizes(self, document: DocumentNode, variables: dict, result: dict = None) -> Tuple[int, int]:
+        """
+        :return: Request and response body sizes of the last operation of the current thread, estimated
+            from the document and the result when the transport does not record them
+        """
+        exchange = getattr(self.transport, 'exchange', None)
+        if exchange is not None:
+            sizes = getattr(exchange, 'request_bytes', None), getattr(exchange, 'response_bytes', None)
+            exchange.request_bytes = exchange.response_bytes = None
+            return sizes
+        dumps = json_codec()[1]
+        request_bytes = len(dumps({'query': document.loc.source.body, 'variables': variables}))
+        return request_bytes, len(dumps({'data': result})) if result is not None else None
+
+    def _send(self, document: DocumentNode, variables: dict = None) -> dict:
+        """
+        Send a parsed operation over the persistent session or a per-call one
+        :param document: Parsed document
+        :param variables: Operation variables
+        :return: Operation result
+        """
+        if self.session is None and self.keep_alive:
+            self.connect()
+        with self.limiter.slot() if self.limiter is not None else nullcontext():
+            if self.session is not None:
+                return self.session.execute(document, variable_values=variables)
+            return self.client.execute(document, variable_values=variables)
+
+    def _execute_stream(self, query: str, variables: dict, path: str) -> Iterator[dict]:
+        """
+        Execute a query and yield the items of one array of its data while the response is still being parsed.
+        Streamed responses bypass the response cache.
+        :param query: GraphQL document source
+        :param variables: Operation variables
+        :param path: Dotted path of the array in the data, for e.g. searchAcrossEntities.searchResults
+        :return: Generator of items
+        """
+        document = _parse_query(query)
+        with self._shared_session():
+            started = time.perf_counter()
+            rows = 0
+            try:
+                # The limiter slot covers the request up to the response headers, not the caller consuming
+                # the items, which may send requests of its own
+                with self.limiter.slot() if self.limiter is not None else nullcontext():
+                    response = self.transport.post_stream(document, variables)
+                    items = self.transport.iter_stream(response, path)
+                    if response.status_code >= 400:
+                        # Error bodies are read at once, so that overload statuses reach the limiter
+                        items = iter(list(items))
+                for item in items:
+                    rows += 1
+                    yield item
+            except Exception as error:
+                self._notify(document, variables, time.perf_counter() - started, error=error, rows=rows)
+                raise
+            self._notify(document, variables, time.perf_counter() - started, rows=rows)
+
+    def _cache_key(self, document: DocumentNode, variables: dict = None):
+        """
+        :return: Response cache key of a cached read operation, None for any other operation
+        """
+        if self.cache is None:
+            return None
+        operation = get_operation_ast(document)
+        if operation.operation != OperationType.QUERY or operation.name is None:
+            return None
+        if operation.name.value not in self.cached_operations:
+            return None
+        return operation.name.value, document.loc.source.body, json.dumps(variables, sort_keys=True, default=str)
+
+    def _invalidate_cache(self, document: DocumentNode, variables: dict = None):
+        """
+        Drop cached responses that a mutation may have made stale
+        """
+        if self.cache is None or get_operation_ast(document).operation != OperationType.MUTATION:
+            return
+        urns = collect_urns(variables)
+        if urns:
+            self.cache.invalidate(urns)
+        else:
+            self.cache.clear()
+
+    def _then(self, result, callback: Callable):
+        """
+        Post-process a result returned by _execute.
+        The async client overrides this to chain the callback onto the pending coroutine.
+        :param result: Result of _execute
+        :param callback: Function applied to the result
+        :return: Processed result
+        """
+        return callback(result)
+
+    @contextmanager
+    def _shared_session(self):
+        """
+        Keep one session open for a block of concurrent calls, the per-call one of gql is not thread-safe.
+        A session opened here is closed on exit unless the client runs in keep-alive mode.
+        """
+        own_session = self.session is None and not self.keep_alive
+        self.connect()
+        try:
+            yield
+        finally:
+            if own_session:
+                self._disconnect()
+
+    def _execute_many(self, calls: List[Tuple[str, dict]], workers: int = 4) -> list:
+        """
+        Execute independent operations, concurrently over one shared session when workers > 1.
+        Like asyncio.gather(return_exceptions=True), a failed operation yields its exception
+        in place of the result instead of failing the others.
+        :param calls: (query, variables) of every operation
+        :param workers: The number of operations in flight
+        :return: Results in the order of calls
+        """
+
+        def run(call):
+            try:
+                return self._execute(*call)
+            except Exception as error:
+                return error
+
+        if workers <= 1 or len(calls) <= 1:
+            return [run(call) for call in calls]
+        with self._shared_session(), ThreadPoolExecutor(max_workers=min(workers, len(calls))) as pool:
+            return list(pool.map(run, calls))
+
+    def _get_many(
+        self,
+        operation: str,
+        field: str,
+        type_name: str,
+        selection: str,
+        urns: List[str],
+        chunk_size: int,
+        workers: int,
+    ) -> dict:
+        """
+        Read many entities by urn with aliased fields, chunk_size entities per request
+        :return: Entities by urn, None for the ones that are missing or failed to resolve
+        """
+        chunks = batch.chunked(dict.fromkeys(urns), chunk_size, self.max_payload_bytes)
+        calls = [
+            (
+                batch.aliased_lookup_query(operation, field, type_name, selection, len(chunk)),
+                {'u%d' % i: urn for i, urn in enumerate(chunk)},
+            )
+            for chunk in chunks
+        ]
+        return self._then(self._execute_many(calls, workers), lambda results: batch.merge_aliased(chunks, results))
+
+    def _iter_pages(
+        self,
+        fetch_page: Callable[[int, int], dict],
+        extract: Callable[[dict], Tuple[int, list]],
+        page_size: int = 100,
+        prefetch: int = 4,
+    ) -> Iterator[dict]:
+        """
+        Iterate over a paginated listing.
+        The first page reveals the total, then up to `prefetch` following pages are requested
+        concurrently while items are still yielded in order.
+        :param fetch_page: Function of (start, count) returning a page
+        :param extract: Function returning (total, items) of a page
+        :param page_size: The number of entities requested per page
+        :param prefetch: The number of pages in flight
+        :return: Generator of items
+        """
+        total, items = extract(fetch_page(0, page_size))
+        yield from items
+        starts = iter(range(page_size, total, page_size))
+        if prefetch <= 1:
+            for start in starts:
+                yield from extract(fetch_page(start, page_size))[1]
+            return
+
+        with self._shared_session(), ThreadPoolExecutor(max_workers=prefetch) as pool:
+            window = deque(pool.submit(fetch_page, start, page_size) for start in islice(starts, prefetch))
+            while window:
+                page = window.popleft().result()
+                window.extend(pool.submit(fetch_page, start, page_size) for start in islice(starts, 1))
+                yield from extract(page)[1]
+
+    def _iter_scroll(
+        self, query: str, search_input: dict, batch_size: int, keep_alive: str, model: type = None
+    ) -> Iterator[dict]:
+        """
+        Iterate over a scrollAcrossEntities listing.
+        Every batch continues from the scroll id of the previous one, so deep listings never hit
+        the search offset limit and each batch costs the same.
+        :param query: scrollAcrossEntities query taking $input: ScrollAcrossEntitiesInput!
+        :param search_input: Search input without scroll parameters
+        :param batch_size: The number of entities requested per batch
+        :param keep_alive: How long the server keeps the scroll context between batches, for e.g. "5m"
+        :param model: Record class of datahub_edp_lib.models to build from every entity, None keeps the dicts
+        :return: Generator of entities
+        """
+        scroll_id = None
+        while True:
+            variables = {
+                'input': dict(search_input, count=batch_size, keepAlive=keep_alive, scrollId=scroll_id),
+            }
+            page = self._execute(query, variables)['scrollAcrossEntities']
+            for row in page['searchResults']:
+                yield row['entity'] if model is None else model.from_entity(row['entity'])
+            scroll_id = page.get('nextScrollId')
+            if not scroll_id or not page['searchResults']:
+                return
+
+    def _get_ingestion_sources(self, start: int = 0, count: int = 100, use_cache: bool = True) -> list:
         """
         Lists all ingestion_sources.
         param: start: The offset of the result set
         param: count: The number of entities to include in result set
+        param: use_cache: Whether the response cache may serve and store the page
         return: Ingestion sources
         """
 
@@ -55,9 +560,119 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 }
                 """
         variables = {'input': {'start': start, 'count': count}}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result['listIngestionSources']
+        return self._then(self._execute(query, variables, use_cache), lambda result: result['listIngestionSources'])
+
+    def _iter_ingestion_sources(
+        self, page_size: int = 100, prefetch: int = 4, typed: bool = False, use_cache: bool = True
+    ) -> Iterator[dict]:
+        """
+        Iterate over all ingestion sources, fetching pages concurrently
+        :param page_size: The number of sources requested per page
+        :param prefetch: The number of pages in flight
+        :param typed: Yield compact IngestionSource records instead of dicts
+        :param use_cache: Whether the response cache may serve and store the pages
+        :return: Generator of ingestion sources
+        """
+        return self._iter_pages(
+            lambda start, count: self._get_ingestion_sources(start, count, use_cache),
+            _ingestion_sources_page(typed),
+            page_size,
+            prefetch,
+        )
+
+    def iter_changed_ingestion_sources(self, checkpoint: Checkpoint, page_size: int = 100) -> Iterator[dict]:
+        """
+        Iterate over the ingestion sources added or changed since the previous run.
+        listIngestionSources has no modification time, so the checkpoint keeps a digest of every
+        source and only the sources whose digest differs are returned. The first run returns every source.
+        Sources are listed past the response cache, so cached pages never hide a change from the checkpoint.
+        :param checkpoint: Checkpoint of the feed, see datahub_edp_lib.checkpoint.Checkpoint
+        :param page_size: The number of sources requested per page
+        :return: Generator of changed ingestion sources
+        """
+        known = checkpoint.get('ingestion_sources', {})
+        digests = {}
+        for source in self._iter_ingestion_sources(page_size, use_cache=False):
+            digests[source['urn']] = digest(source)
+            if known.get(source['urn']) != digests[source['urn']]:
+                yield source
+        checkpoint.set('ingestion_sources', digests)
+
+    def reconcile_ingestion_sources(
+        self,
+        desired_sources: List[dict],
+        chunk_size: int = 20,
+        workers: int = 4,
+        page_size: int = 100,
+        dry_run: bool = False,
+    ) -> ingestion.ReconcileSummary:
+        """
+        Bring ingestion sources to the desired state, writing only the ones that differ.
+        Every source is listed, the desired name, type, schedule, executor, version and recipe are compared
+        with the current ones (recipes as decoded JSON, so formatting and key order do not count), then the
+        missing sources are created and the changed ones updated with chunk_size aliased mutations per request
+        and `workers` requests in flight. Sources that are not desired are left as they are.
+        :param desired_sources: Desired sources shaped as UpdateIngestionSourceInput, see datahub_edp_lib.ingestion
+        :param chunk_size: The number of creations or updates per request
+        :param workers: The number of requests in flight
+        :param page_size: The number of sources requested per page while listing them
+        :param dry_run: Only compare and report what would change
+        :return: Created, updated, unchanged and failed sources
+        """
+        # Listed past the response cache, the diff must be against the current state
+        sources = list(self._iter_ingestion_sources(page_size, workers, use_cache=False))
+        return self._reconcile_ingestion_sources(sources, desired_sources, chunk_size, workers, dry_run)
+
+    def _reconcile_ingestion_sources(
+        self, sources: List[dict], desired_sources: List[dict], chunk_size: int, workers: int, dry_run: bool
+    ) -> ingestion.ReconcileSummary:
+        summary, creates, updates = ingestion.plan(sources, desired_sources, dry_run)
+        if dry_run:
+            creates, updates = {}, {}
+        create_chunks = batch.chunked(
+            creates, chunk_size, self.max_payload_bytes, size_of=lambda name: len(json.dumps(creates[name]))
+        )
+        update_chunks = batch.chunked(
+            updates, chunk_size, self.max_payload_bytes, size_of=lambda urn: len(urn) + len(json.dumps(updates[urn]))
+        )
+        calls = []
+        for chunk in create_chunks:
+            query = batch.aliased_mutation_query(
+                'create_ingestion_sources',
+                '$c%(i)d: UpdateIngestionSourceInput!',
+                'createIngestionSource(input: $c%(i)d)',
+                len(chunk),
+            )
+            calls.append((query, {'c%d' % i: creates[name] for i, name in enumerate(chunk)}))
+        for chunk in update_chunks:
+            query = batch.aliased_mutation_query(
+                'update_ingestion_sources',
+                '$u%(i)d: String!, $c%(i)d: UpdateIngestionSourceInput!',
+                'updateIngestionSource(urn: $u%(i)d, input: $c%(i)d)',
+                len(chunk),
+            )
+            variables = {}
+            for i, urn in enumerate(chunk):
+                variables['u%d' % i] = urn
+                variables['c%d' % i] = updates[urn]
+            calls.append((query, variables))
+
+        def outcome(results: list) -> ingestion.ReconcileSummary:
+            split = len(create_chunks)
+            created = batch.merge_aliased_values(create_chunks, results[:split])
+            for name, urn in created.items():
+                if urn:
+                    summary.created[name] = urn
+                else:
+                    del summary.created[name]
+                    summary.failed[name] = 'Creation failed'
+            updated = batch.merge_aliased_status(update_chunks, results[split:])
+            for urn, ok in updated.items():
+                if not ok:
+                    summary.failed[urn] = 'Update of %s failed' % ', '.join(summary.updated.pop(urn))
+            return summary
+
+        return self._then(self._execute_many(calls, workers), outcome)
 
     def get_container_entities(self, urn: str) -> dict:
         """
@@ -84,9 +699,32 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 }
                 """
         variables = {'urn': urn}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
+
+    def get_containers_entities(self, urns: List[str], chunk_size: int = 50, workers: int = 4) -> dict:
+        """
+        Lists entities of many containers, packing chunk_size containers into one request
+        :param urns: Uniform resource names of containers
+        :param chunk_size: The number of containers per request
+        :param workers: The number of requests in flight
+        :return: Containers entities by container urn, None for missing containers
+        """
+        selection = """
+                entities {
+                    start
+                    count
+                    total
+                    searchResults {
+                        entity {
+                            urn
+                            type
+                        }
+                    }
+                }
+                """
+        return self._get_many(
+            'list_containers_entities', 'container', 'Container', selection, urns, chunk_size, workers
+        )
 
     def _search_container_entities(
         self,
@@ -135,9 +773,7 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 'filters': [{'field': field, 'value': value}],
             },
         }
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
 
     def get_all_containers_urns(self, start: int = 0, count: int = 100) -> dict:
         """
@@ -171,15 +807,330 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 }
                 """
         variables = {'input': {'types': 'CONTAINER', 'query': '*', 'start': start, 'count': count}}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
+
+    def iter_all_containers_urns(self, page_size: int = 100, prefetch: int = 4, typed: bool = False) -> Iterator[dict]:
+        """
+        Iterate over all containers, fetching pages concurrently
+        :param page_size: The number of entities requested per page
+        :param prefetch: The number of pages in flight
+        :param typed: Yield compact EntityRef records instead of dicts
+        :return: Generator of container entities (urn, type)
+        """
+        return self._iter_pages(
+            self.get_all_containers_urns,
+            _search_page('searchAcrossEntities', models.EntityRef if typed else None),
+            page_size,
+            prefetch,
+        )
+
+    def scroll_all_containers_urns(
+        self, batch_size: int = 1000, keep_alive: str = '5m', typed: bool = False
+    ) -> Iterator[dict]:
+        """
+        Iterate over all containers with scrollAcrossEntities, for catalogs beyond the search offset limit
+        :param batch_size: The number of entities requested per batch
+        :param keep_alive: How long the server keeps the scroll context between batches
+        :param typed: Yield compact EntityRef records instead of dicts
+        :return: Generator of container entities (urn, type)
+        """
+        query = """
+                query scroll_across_entities($input: ScrollAcrossEntitiesInput!) {
+                  scrollAcrossEntities(input: $input) {
+                    nextScrollId
+                    count
+                    total
+                    searchResults {
+                      entity {
+                        urn
+                        type
+                        ... on DataPlatform {
+                          urn
+                          type
+                          properties {
+                            displayName
+                          }
+                        }
+                      }
+                    }
+                  }
+                }
+                """
+        return self._iter_scroll(
+            query, {'types': ['CONTAINER'], 'query': '*'}, batch_size, keep_alive, models.EntityRef if typed else None
+        )
+
+    def _list_containers_children(
+        self, urns: List[str], page_size: int = 100, chunk_size: int = 50, workers: int = 4
+    ) -> dict:
+        """
+        Read the first page of entities of many containers, packing chunk_size containers into one request
+        :param urns: Uniform resource names of containers
+        :param page_size: The number of entities requested per container
+        :param chunk_size: The number of containers per request
+        :param workers: The number of requests in flight
+        :return: Containers with their entities by container urn, None for missing containers
+        """
+        selection = """
+                entities(input: {start: 0, count: %d}) {
+                    total
+                    searchResults {
+                        entity {
+                            urn
+                            type
+                        }
+                    }
+                }
+                """ % page_size
+        return self._get_many(
+            'list_containers_children', 'container', 'Container', selection, urns, chunk_size, workers
+        )
+
+    def crawl_containers(
+        self,
+        root_urns: List[str] = None,
+        page_size: int = 100,
+        chunk_size: int = 50,
+        workers: int = 8,
+        stats: CrawlStats = None,
+    ) -> Iterator[Tuple[str, str, dict]]:
+        """
+        Walk the container hierarchy breadth-first and yield its edges as they are discovered.
+        Every level is expanded in waves of chunk_size * workers containers: one aliased request lists
+        the entities of chunk_size containers and `workers` requests are in flight. Containers with more
+        than page_size entities are paged with a container filtered search. Each container is expanded
+        once, even when it is reachable from several roots.
+        :param root_urns: Containers to start from, all containers (listed with scrollAcrossEntities) by default
+        :param page_size: The number of entities requested per container and per search page
+        :param chunk_size: The number of containers per request
+        :param workers: The number of requests in flight
+        :param stats: Counters updated while the crawl runs, for e.g. to report its throughput
+        :return: Generator of (parent container urn, child urn, child entity) edges
+        """
+        stats = stats if stats is not None else CrawlStats()
+        if root_urns is None:
+            root_urns = [entity['urn'] for entity in self.scroll_all_containers_urns()]
+        frontier = list(dict.fromkeys(root_urns))
+        visited = set(frontier)
+        wave_size = chunk_size * max(workers, 1)
+        while frontier:
+            next_level = []
+            for start in range(0, len(frontier), wave_size):
+                stop = start + wave_size
+                wave = frontier[start:stop]
+                containers = self._list_containers_children(wave, page_size, chunk_size, workers)
+                for urn in wave:
+                    total, entities = container_children(containers.get(urn))
+                    if total > len(entities):
+                        entities = list(
+                            self._iter_search_container_entities_datasets(
+                                urn, page_size=page_size, prefetch=workers, projection=Projection()
+                            )
+                        )
+                    stats.containers += 1
+                    for edge in child_edges(urn, entities, visited, next_level):
+                        stats.edges += 1
+                        yield edge
+            frontier = next_level
+            stats.depth += 1
+
+    def get_entity_lineage(self, urn: str, direction: str = 'DOWNSTREAM', start: int = 0, count: int = 100) -> dict:
+        """
+        Get the direct upstream or downstream neighbours of an entity
+        :param urn: Uniform resource name of a dataset, chart, dashboard, data job or other entity with lineage
+        :param direction: UPSTREAM or DOWNSTREAM
+        :param start: The offset of the result set
+        :param count: The number of neighbours to include in result set
+        :return: Entity with a page of lineage relationships (neighbour urn and type)
+        """
+        query = """
+                query get_entity_lineage($urn: String!, $direction: LineageDirection!, $start: Int, $count: Int) {
+                    entity(urn: $urn) {
+                        urn
+                        type
+                        ... on EntityWithRelationships {
+                            lineage(input: {direction: $direction, start: $start, count: $count}) {
+                                total
+                                relationships {
+                                    type
+                                    entity {
+                                        urn
+                                        type
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+        """
+        variables = {'urn': urn, 'direction': lineage.check_direction(direction), 'start': start, 'count': count}
+        return self._execute(query, variables)
+
+    def search_across_lineage(
+        self,
+        urn: str,
+        direction: str = 'DOWNSTREAM',
+        search_query: str = '*',
+        start: int = 0,
+        count: int = 100,
+        degrees: List[str] = None,
+    ) -> dict:
+        """
+        Search the entities reachable from an entity over any number of hops, resolved by GMS
+        :param urn: Uniform resource name of the entity to start from
+        :param direction: UPSTREAM or DOWNSTREAM
+        :param search_query: Query for search, "*" for all entities
+        :param start: The offset of the result set
+        :param count: The number of entities to include in result set
+        :param degrees: Hops to keep, for e.g. ["1", "2", "3+"], all by default
+        :return: Search result (entity urn and type, degree)
+        """
+        query = """
+                query search_across_lineage($input: SearchAcrossLineageInput!) {
+                    searchAcrossLineage(input: $input) {
+                        start
+                        count
+                        total
+                        searchResults {
+                            degree
+                            entity {
+                                urn
+                                type
+                            }
+                        }
+                    }
+                }
+        """
+        search_input = {
+            'urn': urn,
+            'direction': lineage.check_direction(direction),
+            'query': search_query,
+            'start': start,
+            'count': count,
+        }
+        if degrees:
+            search_input['orFilters'] = [{'and': [{'field': 'degree', 'values': list(degrees)}]}]
+        return self._execute(query, {'input': search_input})
+
+    def _list_lineage(
+        self, urns: List[str], direction: str, page_size: int = 100, chunk_size: int = 50, workers: int = 4
+    ) -> dict:
+        """
+        Read the first page of lineage of many entities, packing chunk_size entities into one request
+        :param urns: Uniform resource names of entities
+        :param direction: UPSTREAM or DOWNSTREAM
+        :param page_size: The number of neighbours requested per entity
+        :param chunk_size: The number of entities per request
+        :param workers: The number of requests in flight
+        :return: Entities with their lineage by urn, None for missing entities
+        """
+        selection = """
+                lineage(input: {direction: %s, start: 0, count: %d}) {
+                    total
+                    relationships {
+                        entity {
+                            urn
+                            type
+                        }
+                    }
+                }
+                """ % (lineage.check_direction(direction), page_size)
+        return self._get_many('list_lineage', 'entity', 'EntityWithRelationships', selection, urns, chunk_size, workers)
+
+    def iter_lineage(
+        self,
+        root_urns: List[str],
+        direction: str = 'DOWNSTREAM',
+        max_hops: int = 5,
+        page_size: int = 100,
+        chunk_size: int = 50,
+        workers: int = 8,
+    ) -> Iterator[Tuple[str, str, str, int]]:
+        """
+        Walk the lineage graph breadth-first up to max_hops from the roots and yield its edges as they are discovered.
+        Every hop is expanded in waves of chunk_size * workers entities: one aliased request reads the lineage
+        of chunk_size entities and `workers` requests are in flight. Entities with more than page_size neighbours
+        are paged one by one. Each entity is expanded once per walk, and its neighbours are kept in lineage_cache
+        so later walks reuse them without requests.
+        :param root_urns: Entities to start from
+        :param direction: UPSTREAM for the dependencies of the roots, DOWNSTREAM for their impact
+        :param max_hops: Maximum distance from the roots
+        :param page_size: The number of neighbours requested per entity
+        :param chunk_size: The number of entities per request
+        :param workers: The number of requests in flight
+        :return: Generator of (entity urn, neighbour urn, neighbour type, hops from the roots) edges
+        """
+        lineage.check_direction(direction)
+        frontier = list(dict.fromkeys(root_urns))
+        visited = set(frontier)
+        wave_size = chunk_size * max(workers, 1)
+        for hops in range(1, max_hops + 1):
+            next_level = []
+            for start in range(0, len(frontier), wave_size):
+                stop = start + wave_size
+                wave = frontier[start:stop]
+                known = {urn: self.lineage_cache.get(direction, urn) for urn in wave}
+                missing = [urn for urn, neighbours in known.items() if neighbours is None]
+                entities = self._list_lineage(missing, direction, page_size, chunk_size, workers) if missing else {}
+                for urn in wave:
+                    neighbours = known[urn]
+                    if neighbours is None and entities.get(urn) is not None:
+                        total, related = lineage.entity_lineage(entities[urn])
+                        if total > len(related):
+                            related = list(self._iter_entity_lineage(urn, direction, page_size, workers))
+                        neighbours = self.lineage_cache.put(direction, urn, related)
+                    for edge in lineage.lineage_edges(urn, neighbours or (), hops, visited, next_level):
+                        yield edge
+            frontier = next_level
+            if not frontier:
+                break
+
+    def _iter_entity_lineage(self, urn: str, direction: str, page_size: int, prefetch: int) -> Iterator[dict]:
+        return self._iter_pages(
+            lambda start, count: self.get_entity_lineage(urn, direction, start, count),
+            lambda result: lineage.entity_lineage(result['entity']),
+            page_size,
+            prefetch,
+        )
+
+    def export_snapshot(
+        self,
+        path: str,
+        environments: List[str] = ('PROD',),
+        containers: bool = True,
+        batch_size: int = 1000,
+        workers: int = 8,
+        fast_json: bool = True,
+    ) -> Dict[str, int]:
+        """
+        Stream datasets with their fields and tags, kafka topics and container edges into a local snapshot file,
+        see datahub_edp_lib.snapshot.Snapshot to query it offline
+        :param path: Snapshot file, gzip compressed when it ends with .gz
+        :param environments: FabricTypes to export kafka topics of
+        :param containers: Crawl the container hierarchy and export its edges
+        :param batch_size: The number of entities requested per scroll batch
+        :param workers: The number of requests in flight while crawling containers
+        :param fast_json: Encode records with orjson when it is installed
+        :return: The number of exported records by kind
+        """
+        with SnapshotWriter(path, fast_json) as writer:
+            for dataset in self.scroll_datasets(batch_size=batch_size, typed=True):
+                writer.write_dataset(dataset)
+            for environment in environments:
+                for topic in self.scroll_kafka_topics(environment, batch_size=batch_size, typed=True):
+                    writer.write_kafka_topic(environment, topic)
+            if containers:
+                for parent, child, entity in self.crawl_containers(workers=workers):
+                    writer.write_edge(parent, child, entity.get('type'))
+        return writer.counts
 
     def get_dataset_fields(
         self,
         name: str,
         start: int = 0,
         count: int = 100,
+        projection: Projection = None,
+        stream: bool = False,
     ) -> dict:
         """
         Get fields of the dataset entity.
@@ -187,6 +1138,8 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
         param: query: name of the dataset to search for
         param: start: The offset of the result set
         param: count: The number of entities to include in result set
+        param: projection: Entity sub-selections to request instead of the default ones
+        param: stream: Return a generator of searchResults entries yielded while the response is parsed
         return: Dataset info
         """
 
@@ -216,9 +1169,145 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 }
                 """
         variables = {'input': {'types': 'DATASET', 'query': name, 'start': start, 'count': count}}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        if stream:
+            return self._execute_stream(project(query, projection), variables, 'searchAcrossEntities.searchResults')
+        return self._execute(project(query, projection), variables)
+
+    def iter_dataset_fields(
+        self,
+        name: str,
+        page_size: int = 100,
+        prefetch: int = 4,
+        projection: Projection = None,
+        typed: bool = False,
+    ) -> Iterator[dict]:
+        """
+        Iterate over all datasets matching the name together with their fields, fetching pages concurrently
+        :param name: name of the dataset to search for
+        :param page_size: The number of entities requested per page
+        :param prefetch: The number of pages in flight
+        :param projection: Entity sub-selections to request instead of the default ones
+        :param typed: Yield compact Dataset records instead of dicts
+        :return: Generator of dataset entities
+        """
+        return self._iter_pages(
+            lambda start, count: self.get_dataset_fields(name, start, count, projection),
+            _search_page('searchAcrossEntities', models.Dataset if typed else None),
+            page_size,
+            prefetch,
+        )
+
+    def scroll_datasets(
+        self,
+        search_query: str = '*',
+        batch_size: int = 1000,
+        keep_alive: str = '5m',
+        projection: Projection = None,
+        typed: bool = False,
+        or_filters: List[dict] = None,
+        sort_field: str = None,
+    ) -> Iterator[dict]:
+        """
+        Iterate over all datasets with their fields and tags using scrollAcrossEntities,
+        for catalogs beyond the search offset limit
+        :param search_query: Query for search, "*" is default value for all datasets
+        :param batch_size: The number of entities requested per batch
+        :param keep_alive: How long the server keeps the scroll context between batches
+        :param projection: Entity sub-selections to request instead of the default ones
+        :param typed: Yield compact Dataset records instead of dicts
+        :param or_filters: Search filters https://datahubproject.io/docs/graphql/inputObjects#andfilterinput
+        :param sort_field: Index field to sort the datasets by in ascending order
+        :return: Generator of dataset entities
+        """
+        query = """
+                query scroll_datasets($input: ScrollAcrossEntitiesInput!) {
+                    scrollAcrossEntities(input: $input) {
+                        nextScrollId
+                        count
+                        total
+                        searchResults {
+                            entity {
+                                urn
+                                type
+                                ... on Dataset {
+                                    name
+                                    properties {
+                                        name
+                                    }
+                                    editableProperties {
+                                        description
+                                    }
+                                    schemaMetadata {
+                                        fields {
+                                            fieldPath
+                                        }
+                                    }
+                                    tags {
+                                        tags {
+                                            tag {
+                                                urn
+                                                name
+                                            }
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+                """
+        search_input = {'types': ['DATASET'], 'query': search_query}
+        if or_filters:
+            search_input['orFilters'] = or_filters
+        if sort_field:
+            search_input['sortInput'] = {'sortCriterion': {'field': sort_field, 'sortOrder': 'ASCENDING'}}
+        return self._iter_scroll(
+            project(query, projection),
+            search_input,
+            batch_size,
+            keep_alive,
+            models.Dataset if typed else None,
+        )
+
+    def iter_changed_datasets(
+        self,
+        checkpoint: Checkpoint,
+        field: str = 'lastOperationTime',
+        overlap: float = 300.0,
+        batch_size: int = 1000,
+        keep_alive: str = '5m',
+        projection: Projection = None,
+        typed: bool = False,
+    ) -> Iterator[dict]:
+        """
+        Iterate over the datasets added or changed since the previous run, with their fields and tags.
+        The first run returns every dataset. The checkpoint moves to the start time of the run once
+        the generator is exhausted, so an interrupted run is repeated in full by the next one.
+        :param checkpoint: Checkpoint of the feed, see datahub_edp_lib.checkpoint.Checkpoint
+        :param field: Index field holding the last modification time in milliseconds
+        :param overlap: Seconds re-read before the checkpoint, covers clock skew and indexing lag
+        :param batch_size: The number of entities requested per batch
+        :param keep_alive: How long the server keeps the scroll context between batches
+        :param projection: Entity sub-selections to request instead of the default ones
+        :param typed: Yield compact Dataset records instead of dicts
+        :return: Generator of changed dataset entities, oldest change first
+        """
+        key = 'datasets:' + field
+        started = now_millis()
+        since = checkpoint.get(key)
+        or_filters = None
+        if since is not None:
+            since = max(since - int(overlap * 1000), 0)
+            or_filters = [{'and': [{'field': field, 'condition': 'GREATER_THAN', 'values': [str(since)]}]}]
+        yield from self.scroll_datasets(
+            batch_size=batch_size,
+            keep_alive=keep_alive,
+            projection=projection,
+            typed=typed,
+            or_filters=or_filters,
+            sort_field=field,
+        )
+        checkpoint.set(key, started)
 
     def _search_container_entities_datasets(
         self,
@@ -228,12 +1317,16 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
         search_query: str = '',
         start: int = 0,
         count: int = 100,
+        projection: Projection = None,
+        stream: bool = False,
     ) -> dict:
         """
         Lists all container entities.
         param: value: Value of the field to filter by, for e.g. full urn of container
         param: types: Entity types to be searched https://datahubproject.io/docs/graphql/enums#entitytype
         param: field: Entity field to be searched
+        param: projection: Entity sub-selections to request instead of the default ones
+        param: stream: Return a generator of searchResults entries yielded while the response is parsed
         return: Containers entities
         """
 
@@ -274,9 +1367,41 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 'filters': [{'field': field, 'value': value}],
             },
         }
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        if stream:
+            return self._execute_stream(project(query, projection), variables, 'searchAcrossEntities.searchResults')
+        return self._execute(project(query, projection), variables)
+
+    def _iter_search_container_entities_datasets(
+        self,
+        value: str,
+        types: List[str] = None,
+        field: str = 'container',
+        search_query: str = '',
+        page_size: int = 100,
+        prefetch: int = 4,
+        projection: Projection = None,
+        typed: bool = False,
+    ) -> Iterator[dict]:
+        """
+        Iterate over all container entities, fetching pages concurrently
+        :param value: Value of the field to filter by, for e.g. full urn of container
+        :param types: Entity types to be searched https://datahubproject.io/docs/graphql/enums#entitytype
+        :param field: Entity field to be searched
+        :param search_query: Query for search
+        :param page_size: The number of entities requested per page
+        :param prefetch: The number of pages in flight
+        :param projection: Entity sub-selections to request instead of the default ones
+        :param typed: Yield compact Dataset records instead of dicts
+        :return: Generator of container entities
+        """
+        return self._iter_pages(
+            lambda start, count: self._search_container_entities_datasets(
+                value, types, field, search_query, start, count, projection
+            ),
+            _search_page('searchAcrossEntities', models.Dataset if typed else None),
+            page_size,
+            prefetch,
+        )
 
     def _search_entities(self, entity_type: str, search_query: str, start: int = 0, count: int = 100) -> dict:
         """
@@ -314,9 +1439,26 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 'count': count,
             }
         }
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
+
+    def _iter_search_entities(
+        self, entity_type: str, search_query: str, page_size: int = 100, prefetch: int = 4, typed: bool = False
+    ) -> Iterator[dict]:
+        """
+        Iterate over all entities found by input type and query, fetching pages concurrently
+        :param entity_type: Entitie type, full list https://datahubproject.io/docs/graphql/enums#entitytype
+        :param search_query: Query for search, for e.g "DWH"
+        :param page_size: The number of entities requested per page
+        :param prefetch: The number of pages in flight
+        :param typed: Yield compact EntityRef records instead of dicts
+        :return: Generator of entities
+        """
+        return self._iter_pages(
+            lambda start, count: self._search_entities(entity_type, search_query, start, count),
+            _search_page('search', models.EntityRef if typed else None),
+            page_size,
+            prefetch,
+        )
 
     def _update_container_description(self, urn: str, description: str) -> dict:
         """
@@ -336,9 +1478,7 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 """
 
         variables = {'urn': urn, 'description': description}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
 
     def _update_dataset_description(self, urn: str, description: str) -> dict:
         """
@@ -361,9 +1501,39 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
             'urn': urn,
             'input': {'editableProperties': {'description': description}},
         }
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
+
+    def update_descriptions(self, descriptions: Dict[str, str], chunk_size: int = 50, workers: int = 4) -> dict:
+        """
+        Update descriptions of many entities (datasets, containers, ...) with one multi-mutation
+        request per chunk_size entities
+        :param descriptions: Description by uniform resource name
+        :param chunk_size: The number of updates per request
+        :param workers: The number of requests in flight
+        :return: Update status by urn: True if the description was updated
+        """
+        chunks = batch.chunked(
+            descriptions,
+            chunk_size,
+            self.max_payload_bytes,
+            size_of=lambda urn: len(urn) + len(descriptions[urn]),
+        )
+        calls = []
+        for chunk in chunks:
+            query = batch.aliased_mutation_query(
+                'updateDescriptions',
+                '$u%(i)d: String!, $d%(i)d: String!',
+                'updateDescription(input: {description: $d%(i)d, resourceUrn: $u%(i)d})',
+                len(chunk),
+            )
+            variables = {}
+            for i, urn in enumerate(chunk):
+                variables['u%d' % i] = urn
+                variables['d%d' % i] = descriptions[urn]
+            calls.append((query, variables))
+        return self._then(
+            self._execute_many(calls, workers), lambda results: batch.merge_aliased_status(chunks, results)
+        )
 
     def _get_dataset_custom_properties(self, urn: str) -> dict:
         """
@@ -387,9 +1557,28 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 }
                 """
         variables = {'urn': urn}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
+
+    def _get_datasets_custom_properties(self, urns: List[str], chunk_size: int = 100, workers: int = 4) -> dict:
+        """
+        Get custom properties of many Datasets, packing chunk_size datasets into one request
+        :param urns: Uniform resource names of datasets
+        :param chunk_size: The number of datasets per request
+        :param workers: The number of requests in flight
+        :return: Dataset urn, name and its custom properties by dataset urn, None for missing datasets
+        """
+        selection = """
+                urn
+                name
+                properties {
+                    customProperties {
+                        key
+                        value
+                        associatedUrn
+                    }
+                }
+                """
+        return self._get_many('get_datasets_props', 'dataset', 'Dataset', selection, urns, chunk_size, workers)
 
     def _get_dataset_tags(self, urn: str) -> dict:
         """
@@ -415,9 +1604,30 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
             }
         """
         variables = {'urn': urn}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
+
+    def _get_datasets_tags(self, urns: List[str], chunk_size: int = 100, workers: int = 4) -> dict:
+        """
+        Get tags of many Datasets, packing chunk_size datasets into one request
+        :param urns: Uniform resource names of datasets
+        :param chunk_size: The number of datasets per request
+        :param workers: The number of requests in flight
+        :return: Dataset urn, name and its tags by dataset urn, None for missing datasets
+        """
+        selection = """
+                urn
+                name
+                tags {
+                    tags {
+                        tag {
+                            urn
+                            name
+                            description
+                        }
+                    }
+                }
+                """
+        return self._get_many('get_datasets_tags', 'dataset', 'Dataset', selection, urns, chunk_size, workers)
 
     def create_tag(self, tag_name: str, description: str) -> dict:
         """
@@ -432,9 +1642,58 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 }
                 """
         variables = {'name': tag_name, 'description': description}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
+
+    def ensure_tags(self, tags: List[Tuple[str, str]], chunk_size: int = 100, workers: int = 4) -> Dict[str, str]:
+        """
+        Make sure the tags exist, creating only the missing ones.
+        Existence is checked with batched lookups, and every tag found or created is remembered
+        in tag_index, so repeated calls and later add_tag calls need no existence checks.
+        :param tags: (name, description) of every tag
+        :param chunk_size: The number of tags per lookup or creation request
+        :param workers: The number of requests in flight
+        :return: Tag urn by name, None for tags that could not be created
+        """
+        descriptions = dict(tags)
+        urns = {name: 'urn:li:tag:' + name for name in descriptions if name not in self.tag_index}
+
+        def index(urns_by_name: Dict[str, str]) -> Dict[str, str]:
+            self.tag_index.update((name, urn) for name, urn in urns_by_name.items() if urn)
+            return {name: self.tag_index.get(name) for name in descriptions}
+
+        def create_missing(found: dict):
+            missing = []
+            for name, urn in urns.items():
+                if (found.get(urn) or {}).get('properties'):
+                    self.tag_index[name] = urn
+                else:
+                    missing.append(name)
+            return self._then(self._create_tags(missing, descriptions, chunk_size, workers), index)
+
+        return self._then(self.search_for_tags(list(urns.values()), chunk_size, workers), create_missing)
+
+    def _create_tags(self, names: List[str], descriptions: Dict[str, str], chunk_size: int, workers: int) -> dict:
+        """
+        Create many tags with aliased createTag mutations
+        :return: Created tag urn by name, None for tags that failed
+        """
+        chunks = batch.chunked(
+            names, chunk_size, self.max_payload_bytes, size_of=lambda name: 2 * len(name) + len(descriptions[name])
+        )
+        calls = []
+        for chunk in chunks:
+            query = batch.aliased_mutation_query(
+                'create_tags',
+                '$n%(i)d: String!, $d%(i)d: String!',
+                'createTag(input: {id: $n%(i)d, name: $n%(i)d, description: $d%(i)d})',
+                len(chunk),
+            )
+            variables = {}
+            for i, name in enumerate(chunk):
+                variables['n%d' % i] = name
+                variables['d%d' % i] = descriptions[name]
+            calls.append((query, variables))
+        return self._then(self._execute_many(calls, workers), lambda results: batch.merge_aliased(chunks, results))
 
     def search_for_tag(self, tag_urn: str) -> dict:
         """
@@ -452,9 +1711,22 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                     }
                 """
         variables = {'urn': tag_urn}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
+
+    def search_for_tags(self, tag_urns: List[str], chunk_size: int = 200, workers: int = 4) -> dict:
+        """
+        Search for many tags, packing chunk_size tags into one request
+        :param tag_urns: The urns of the tags
+        :param chunk_size: The number of tags per request
+        :param workers: The number of requests in flight
+        :return: Name of every tag by tag urn, None for missing tags
+        """
+        selection = """
+                properties {
+                    name
+                }
+                """
+        return self._get_many('list_tags_entities', 'tag', 'Tag', selection, tag_urns, chunk_size, workers)
 
     def delete_tag(self, urn: str) -> dict:
         """
@@ -468,9 +1740,9 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 }
                 """
         variables = {'urn': urn}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        for name in [name for name, tag_urn in self.tag_index.items() if tag_urn == urn]:
+            del self.tag_index[name]
+        return self._execute(query, variables)
 
     def add_tag(self, tag_urn: str, resource_urn: str) -> dict:
         """
@@ -525,9 +1797,7 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
             'tagUrns': tag_urns,
             'resources': [{'resourceUrn': urn} for urn in resource_urns],
         }
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
 
     def add_field_tag(self, tag_urn: str, resource_urn: str, subresource: str) -> dict:
         """
@@ -562,9 +1832,106 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
             % datahub_method
         )
         variables = {'tagUrns': tag_urns, 'resourceUrn': resource_urn, 'subResource': subresource}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
+
+    def batch_add_field_tags(
+        self, field_tags: List[Tuple[str, str, List[str]]], chunk_size: int = 100, workers: int = 4
+    ) -> List[bool]:
+        """
+        Add tags to many dataset fields across many datasets
+        :param field_tags: (resource_urn, field_path, tag_urns) triples
+        :param chunk_size: The number of fields per batchAddTags and of batchAddTags per request
+        :param workers: The number of requests in flight
+        :return: Success of every triple, in input order
+        """
+        return self._batch_add_or_remove_resource_tags(
+            _field_resources(field_tags), 'batchAddTags', chunk_size, workers
+        )
+
+    def batch_remove_field_tags(
+        self, field_tags: List[Tuple[str, str, List[str]]], chunk_size: int = 100, workers: int = 4
+    ) -> List[bool]:
+        """
+        Remove tags from many dataset fields across many datasets
+        :param field_tags: (resource_urn, field_path, tag_urns) triples
+        :param chunk_size: The number of fields per batchRemoveTags and of batchRemoveTags per request
+        :param workers: The number of requests in flight
+        :return: Success of every triple, in input order
+        """
+        return self._batch_add_or_remove_resource_tags(
+            _field_resources(field_tags), 'batchRemoveTags', chunk_size, workers
+        )
+
+    def write_behind(
+        self, max_pending: int = 1000, max_delay: float = 1.0, chunk_size: int = 100, workers: int = 4
+    ) -> MutationQueue:
+        """
+        Buffer add_tag, remove_tag, add_field_tag and remove_field_tag calls and send them in batches.
+        Opens the persistent session, flushes from the timer thread share it with the calling thread;
+        the queue is flushed by close() of the client.
+        :param max_pending: Pending operations triggering a flush on the calling thread
+        :param max_delay: Seconds an operation may stay pending, flushed on a timer thread
+        :param chunk_size: The number of resources per batch mutation and of batch mutations per request
+        :param workers: The number of requests in flight during a flush
+        :return: The queue, its methods return futures resolving to the success of every operation
+        """
+        if self.mutation_queue is not None:
+            self.mutation_queue.flush()
+        self.connect()
+        self.mutation_queue = MutationQueue(self, max_pending, max_delay, chunk_size, workers)
+        return self.mutation_queue
+
+    def _batch_add_or_remove_resource_tags(
+        self, resource_tags: List[Tuple[dict, List[str]]], datahub_method: str, chunk_size: int, workers: int
+    ) -> List[bool]:
+        """
+        :param resource_tags: (ResourceRefInput, tag_urns) pairs
+        :param datahub_method: batchAddTags or batchRemoveTags
+        :param chunk_size: The number of resources per batch mutation and of batch mutations per request
+        :param workers: The number of requests in flight
+        :return: Success of every pair, in input order
+        """
+        # Resources sharing a tag set go into one batch mutation, batch mutations are packed into aliased documents
+        groups: Dict[Tuple[str, ...], List[Tuple[int, dict]]] = {}
+        for index, (resource, tag_urns) in enumerate(resource_tags):
+            groups.setdefault(tuple(sorted(set(tag_urns))), []).append((index, resource))
+        pieces = []
+        for tag_urns, members in groups.items():
+            for start in range(0, len(members) if tag_urns else 0, chunk_size):
+                stop = start + chunk_size
+                pieces.append((tag_urns, members[start:stop]))
+
+        def size_of(piece_id: int) -> int:
+            tag_urns, members = pieces[piece_id]
+            resources_size = sum(
+                len(resource['resourceUrn']) + len(resource.get('subResource') or '') for _, resource in members
+            )
+            return sum(map(len, tag_urns)) + resources_size + 64 * len(members)
+
+        chunks = batch.chunked(range(len(pieces)), chunk_size, self.max_payload_bytes, size_of=size_of)
+        calls = []
+        for chunk in chunks:
+            query = batch.aliased_mutation_query(
+                'batch_add_or_remove_field_tags',
+                '$t%(i)d: [String!]!, $r%(i)d: [ResourceRefInput!]!',
+                datahub_method + '(input: {tagUrns: $t%(i)d, resources: $r%(i)d})',
+                len(chunk),
+            )
+            variables = {}
+            for i, piece_id in enumerate(chunk):
+                tag_urns, members = pieces[piece_id]
+                variables['t%d' % i] = list(tag_urns)
+                variables['r%d' % i] = [resource for _, resource in members]
+            calls.append((query, variables))
+
+        def statuses(results: list) -> List[bool]:
+            succeeded = [not tag_urns for _, tag_urns in resource_tags]
+            for piece_id, ok in batch.merge_aliased_status(chunks, results).items():
+                for index, _ in pieces[piece_id][1]:
+                    succeeded[index] = ok
+            return succeeded
+
+        return self._then(self._execute_many(calls, workers), statuses)
 
     def update_ingestion_recipe(
         self,
@@ -601,9 +1968,7 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                 'config': {'executorId': executor_id, 'version': version, 'recipe': recipe},
             },
         }
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
 
     def get_kafka_topics(
         self,
@@ -611,6 +1976,8 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
         search_query: str = '*',
         start: int = 0,
         count: int = 100,
+        projection: Projection = None,
+        use_cache: bool = True,
     ) -> dict:
         """
         Get kafka topics for specified environment
@@ -618,6 +1985,8 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
         :param search_query: Query for search, for e.g. "smi". "*" is default value for all topics
         :param start: The offset of the result set
         :param count: The number of entities to include in result set
+        :param projection: Entity sub-selections to request instead of the default ones
+        :param use_cache: Whether the response cache may serve and store the page
         :return: Search result (Kafka dataset information: resource urn, topic name, resource tags)
         """
         query = """
@@ -667,9 +2036,100 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
             'start': start,
             'count': count,
         }
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(project(query, projection), variables, use_cache)
+
+    def iter_kafka_topics(
+        self,
+        environment: str,
+        search_query: str = '*',
+        page_size: int = 100,
+        prefetch: int = 4,
+        projection: Projection = None,
+        typed: bool = False,
+        use_cache: bool = True,
+    ) -> Iterator[dict]:
+        """
+        Iterate over all kafka topics of the environment, fetching pages concurrently
+        :param environment: FabricType (https://datahubproject.io/docs/graphql/enums/#fabrictype)
+        :param search_query: Query for search, for e.g. "smi". "*" is default value for all topics
+        :param page_size: The number of entities requested per page
+        :param prefetch: The number of pages in flight
+        :param projection: Entity sub-selections to request instead of the default ones
+        :param typed: Yield compact KafkaTopic records instead of dicts
+        :param use_cache: Whether the response cache may serve and store the pages
+        :return: Generator of kafka datasets (resource urn, topic name, resource tags)
+        """
+        return self._iter_pages(
+            lambda start, count: self.get_kafka_topics(environment, search_query, start, count, projection, use_cache),
+            _search_page('search', models.KafkaTopic if typed else None),
+            page_size,
+            prefetch,
+        )
+
+    def scroll_kafka_topics(
+        self,
+        environment: str,
+        search_query: str = '*',
+        batch_size: int = 1000,
+        keep_alive: str = '5m',
+        projection: Projection = None,
+        typed: bool = False,
+    ) -> Iterator[dict]:
+        """
+        Iterate over all kafka topics of the environment with scrollAcrossEntities,
+        for catalogs beyond the search offset limit
+        :param environment: FabricType (https://datahubproject.io/docs/graphql/enums/#fabrictype)
+        :param search_query: Query for search, for e.g. "smi". "*" is default value for all topics
+        :param batch_size: The number of entities requested per batch
+        :param keep_alive: How long the server keeps the scroll context between batches
+        :param projection: Entity sub-selections to request instead of the default ones
+        :param typed: Yield compact KafkaTopic records instead of dicts
+        :return: Generator of kafka datasets (resource urn, topic name, resource tags)
+        """
+        query = """
+                query scroll_kafka_topics($input: ScrollAcrossEntitiesInput!) {
+                    scrollAcrossEntities(input: $input) {
+                        nextScrollId
+                        count
+                        total
+                        searchResults {
+                            entity {
+                                ... on Dataset {
+                                    urn
+                                    name
+                                    properties {
+                                        name
+                                    }
+                                    tags {
+                                        tags {
+                                            tag {
+                                                urn
+                                                name
+                                            }
+                                            associatedUrn
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+        """
+        search_input = {
+            'types': ['DATASET'],
+            'query': search_query,
+            'orFilters': [
+                {
+                    'and': [
+                        {'field': 'platform', 'values': ['urn:li:dataPlatform:kafka']},
+                        {'field': 'origin', 'values': [environment]},
+                    ]
+                }
+            ],
+        }
+        return self._iter_scroll(
+            project(query, projection), search_input, batch_size, keep_alive, models.KafkaTopic if typed else None
+        )
 
     def get_kafka_topic_by_name(
         self,
@@ -677,6 +2137,7 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
         topic_name: str = '',
         start: int = 0,
         count: int = 100,
+        projection: Projection = None,
     ) -> dict:
         """
         Get kafka topics for specified environment
@@ -684,6 +2145,7 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
         :param topic_name: Name of a kafka topic
         :param start: The offset of the result set
         :param count: The number of entities to include in result set
+        :param projection: Entity sub-selections to request instead of the default ones
         :return: Search result (Kafka dataset information: resource urn, topic name, resource tags)
         """
         query = """
@@ -737,9 +2199,25 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
             'start': start,
             'count': count,
         }
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(project(query, projection), variables)
+
+    def kafka_topic_index(
+        self, environment: str, ttl: float = 300.0, miss_refresh_interval: float = 30.0
+    ) -> KafkaTopicIndex:
+        """
+        In-memory index of the kafka topics of the environment by name, for many lookups by name
+        without a search per lookup. The index is created and loaded once per environment.
+        :param environment: FabricType (https://datahubproject.io/docs/graphql/enums/#fabrictype)
+        :param ttl: Seconds after which a lookup reloads the index, None to never expire it
+        :param miss_refresh_interval: Minimum seconds between reloads caused by lookups of unknown names
+        :return: KafkaTopicIndex
+        """
+        index = self.kafka_topic_indexes.get(environment)
+        if index is None:
+            index = self.kafka_topic_indexes[environment] = KafkaTopicIndex(
+                self, environment, ttl, miss_refresh_interval
+            )
+        return index
 
     def create_secret_input(self, name: str, value: str, description: str):
         """
@@ -754,9 +2232,7 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
                         """
 
         variables = {'name': name, 'value': value, 'description': description}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        return self._execute(query, variables)
 
     def create_ingestion(
         self,
@@ -805,6 +2281,5 @@ query listIngestionSources($input: ListIngestionSourcesInput!) {
     }}"""
 
         variables = {'name': name, 'type': db_type, 'description': description}
-        query = gql(query)
-        result = self.client.execute(query, variable_values=variables)
-        return result
+        # The recipe carries credentials inline, so this document is parsed per call and never cached
+        return self._execute(gql(query), variables)
@@ -0,0 +1,364 @@
+import asyncio
+import inspect
+import time
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, List, Tuple, Union
+
+import aiohttp
+from gql import Client
+from gql.transport.aiohttp import AIOHTTPTransport
+from graphql import DocumentNode
+
+from datahub_edp_lib import DataHubGraphql, _parse_query, lineage
+from datahub_edp_lib.cache import ResponseCache, collect_urns
+from datahub_edp_lib.checkpoint import Checkpoint, digest, now_millis
+from datahub_edp_lib.crawl import CrawlStats, child_edges, container_children
+from datahub_edp_lib.ingestion import ReconcileSummary
+from datahub_edp_lib.limiter import RateLimiter
+from datahub_edp_lib.metrics import OperationEvent
+from datahub_edp_lib.projections import Projection
+from datahub_edp_lib.resilience import CircuitBreaker, RetryPolicy
+from datahub_edp_lib.snapshot import SnapshotWriter
+
+
+class AsyncDataHubGraphql(DataHubGraphql):
+    """
+    Asyncio counterpart of DataHubGraphql.
+    Every public method of DataHubGraphql is available here as a coroutine, and the iter_* methods
+    return async generators. All calls share one aiohttp session, and at most `concurrency`
+    operations are in flight at any moment, so thousands of calls can be scheduled at once
+    with asyncio.gather.
+
+        async with AsyncDataHubGraphql(base_url, token, concurrency=32) as datahub:
+            tags = await asyncio.gather(*(datahub._get_dataset_tags(urn) for urn in urns))
+    """
+
+    def __init__(
+        self,
+        base_url,
+        token,
+        use_ssl=False,
+        concurrency=50,
+        pool_size=None,
+        cache: ResponseCache = None,
+        limiter: RateLimiter = None,
+        hooks: List[Callable[[OperationEvent], None]] = None,
+        retry_policies: Dict[str, RetryPolicy] = None,
+        circuit_breaker: CircuitBreaker = None,
+    ):
+        """
+        :param base_url: GMS GraphQL endpoint
+        :param token: Access token generated in the Datahub UI
+        :param use_ssl: Verify the server's TLS certificate
+        :param concurrency: Maximum number of operations in flight
+        :param pool_size: Maximum number of open connections, defaults to concurrency
+        :param cache: Response cache, see DataHubGraphql
+        :param limiter: Rate and adaptive concurrency limiter, see DataHubGraphql; concurrency stays the upper bound
+        :param hooks: Functions called with an OperationEvent after every operation, see DataHubGraphql
+        :param retry_policies: Retry policies by operation class, see DataHubGraphql
+        :param circuit_breaker: Circuit breaker failing calls fast while GMS is down
+        """
+        super().__init__(
+            base_url,
+            token,
+            use_ssl=use_ssl,
+            pool_size=pool_size or concurrency,
+            cache=cache,
+            limiter=limiter,
+            hooks=hooks,
+            retry_policies=retry_policies,
+            circuit_breaker=circuit_breaker,
+        )
+        self.concurrency = concurrency
+
+        self.transport = AIOHTTPTransport(
+            url=self.base_url,
+            headers=self.request_header,
+            ssl=None if self.use_ssl else False,
+        )
+        self.client = Client(transport=self.transport)
+        self._semaphore = None
+        self._connect_lock = None
+
+    def __enter__(self):
+        raise TypeError('Use "async with" with AsyncDataHubGraphql')
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def connect(self) -> 'AsyncDataHubGraphql':
+        """
+        Open the shared aiohttp session.
+        Called implicitly by the first operation, so it is only needed to connect eagerly.
+        :return: The client itself
+        """
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.session is None:
+                self.transport.client_session_args = {'connector': aiohttp.TCPConnector(limit=self.pool_size)}
+                self.session = await self.client.connect_async()
+        return self
+
+    async def close(self):
+        """
+        Close the shared aiohttp session
+        """
+        if self.session is not None:
+            await self.client.close_async()
+            self.session = None
+
+    def write_behind(self, *args, **kwargs):
+        raise TypeError('The write-behind queue is only available on DataHubGraphql')
+
+    def kafka_topic_index(self, *args, **kwargs):
+        raise TypeError('The kafka topic index is only available on DataHubGraphql')
+
+    async def _execute(self, query: Union[str, DocumentNode], variables: dict = None, use_cache: bool = True) -> dict:
+        document = _parse_query(query) if isinstance(query, str) else query
+        cache_key = self._cache_key(document, variables) if use_cache else None
+        if cache_key is not None:
+            result = self.cache.get(cache_key)
+            if result is not None:
+                self._notify(document, variables, 0.0, result, cached=True)
+                return result
+        started = time.perf_counter()
+        try:
+            result = await self._sender(document)(document, variables)
+        except Exception as error:
+            self._notify(document, variables, time.perf_counter() - started, error=error)
+            raise
+        finally:
+            self._invalidate_cache(document, variables)
+        self._notify(document, variables, time.perf_counter() - started, result)
+        if cache_key is not None:
+            self.cache.put(cache_key, result, collect_urns(variables) | collect_urns(result))
+        return result
+
+    async def _guarded_send(self, document: DocumentNode, variables: dict = None) -> dict:
+        if self.circuit_breaker is None:
+            return await self._send(document, variables)
+        self.circuit_breaker.before_call()
+        try:
+            result = await self._send(document, variables)
+        except Exception as error:
+            self.circuit_breaker.record(error)
+            raise
+        self.circuit_breaker.record()
+        return result
+
+    async def _send(self, document: DocumentNode, variables: dict = None) -> dict:
+        if self.session is None:
+            await self.connect()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            if self.limiter is None:
+                return await self.session.execute(document, variable_values=variables)
+            async with self.limiter.async_slot():
+                return await self.session.execute(document, variable_values=variables)
+
+    async def _execute_stream(self, query: str, variables: dict, path: str) -> AsyncIterator[dict]:
+        # aiohttp responses are decoded at once, the items are yielded afterwards, once the limiter slot
+        # of the request is released
+        items = await self._execute(query, variables)
+        for key in path.split('.'):
+            items = items[key]
+        for item in items:
+            yield item
+
+    async def _then(self, result, callback: Callable):
+        # Callbacks may start further operations, their coroutines are awaited in turn
+        value = callback(await result)
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
+    async def _execute_many(self, calls: List[Tuple[str, dict]], workers: int = 4) -> list:
+        # Concurrency is bounded by the client-wide semaphore, workers is kept for signature compatibility
+        return await asyncio.gather(*(self._execute(*call) for call in calls), return_exceptions=True)
+
+    async def _iter_pages(
+        self,
+        fetch_page: Callable[[int, int], dict],
+        extract: Callable[[dict], Tuple[int, list]],
+        page_size: int = 100,
+        prefetch: int = 4,
+    ) -> AsyncIterator[dict]:
+        total, items = extract(await fetch_page(0, page_size))
+        for item in items:
+            yield item
+        starts = iter(range(page_size, total, page_size))
+        window = deque(
+            asyncio.ensure_future(fetch_page(start, page_size)) for start in islice(starts, max(prefetch, 1))
+        )
+        try:
+            while window:
+                page = await window.popleft()
+                window.extend(asyncio.ensure_future(fetch_page(start, page_size)) for start in islice(starts, 1))
+                for item in extract(page)[1]:
+                    yield item
+        finally:
+            for task in window:
+                task.cancel()
+
+    async def _iter_scroll(
+        self, query: str, search_input: dict, batch_size: int, keep_alive: str, model: type = None
+    ) -> AsyncIterator[dict]:
+        scroll_id = None
+        while True:
+            variables = {
+                'input': dict(search_input, count=batch_size, keepAlive=keep_alive, scrollId=scroll_id),
+            }
+            page = (await self._execute(query, variables))['scrollAcrossEntities']
+            for row in page['searchResults']:
+                yield row['entity'] if model is None else model.from_entity(row['entity'])
+            scroll_id = page.get('nextScrollId')
+            if not scroll_id or not page['searchResults']:
+                return
+
+    async def crawl_containers(
+        self,
+        root_urns: List[str] = None,
+        page_size: int = 100,
+        chunk_size: int = 50,
+        workers: int = 8,
+        stats: CrawlStats = None,
+    ) -> AsyncIterator[Tuple[str, str, dict]]:
+        stats = stats if stats is not None else CrawlStats()
+        if root_urns is None:
+            root_urns = [entity['urn'] async for entity in self.scroll_all_containers_urns()]
+        frontier = list(dict.fromkeys(root_urns))
+        visited = set(frontier)
+        wave_size = chunk_size * max(workers, 1)
+        while frontier:
+            next_level = []
+            for start in range(0, len(frontier), wave_size):
+                stop = start + wave_size
+                wave = frontier[start:stop]
+                containers = await self._list_containers_children(wave, page_size, chunk_size, workers)
+                for urn in wave:
+                    total, entities = container_children(containers.get(urn))
+                    if total > len(entities):
+                        entities = [
+                            entity
+                            async for entity in self._iter_search_container_entities_datasets(
+                                urn, page_size=page_size, prefetch=workers, projection=Projection()
+                            )
+                        ]
+                    stats.containers += 1
+                    for edge in child_edges(urn, entities, visited, next_level):
+                        stats.edges += 1
+                        yield edge
+            frontier = next_level
+            stats.depth += 1
+
+    async def iter_lineage(
+        self,
+        root_urns: List[str],
+        direction: str = 'DOWNSTREAM',
+        max_hops: int = 5,
+        page_size: int = 100,
+        chunk_size: int = 50,
+        workers: int = 8,
+    ) -> AsyncIterator[Tuple[str, str, str, int]]:
+        lineage.check_direction(direction)
+        frontier = list(dict.fromkeys(root_urns))
+        visited = set(frontier)
+        wave_size = chunk_size * max(workers, 1)
+        for hops in range(1, max_hops + 1):
+            next_level = []
+            for start in range(0, len(frontier), wave_size):
+                stop = start + wave_size
+                wave = frontier[start:stop]
+                known = {urn: self.lineage_cache.get(direction, urn) for urn in wave}
+                missing = [urn for urn, neighbours in known.items() if neighbours is None]
+                entities = (
+                    await self._list_lineage(missing, direction, page_size, chunk_size, workers) if missing else {}
+                )
+                for urn in wave:
+                    neighbours = known[urn]
+                    if neighbours is None and entities.get(urn) is not None:
+                        total, related = lineage.entity_lineage(entities[urn])
+                        if total > len(related):
+                            related = [
+                                entity async for entity in self._iter_entity_lineage(urn, direction, page_size, workers)
+                            ]
+                        neighbours = self.lineage_cache.put(direction, urn, related)
+                    for edge in lineage.lineage_edges(urn, neighbours or (), hops, visited, next_level):
+                        yield edge
+            frontier = next_level
+            if not frontier:
+                break
+
+    async def export_snapshot(
+        self,
+        path: str,
+        environments: List[str] = ('PROD',),
+        containers: bool = True,
+        batch_size: int = 1000,
+        workers: int = 8,
+        fast_json: bool = True,
+    ) -> Dict[str, int]:
+        with SnapshotWriter(path, fast_json) as writer:
+            async for dataset in self.scroll_datasets(batch_size=batch_size, typed=True):
+                writer.write_dataset(dataset)
+            for environment in environments:
+                async for topic in self.scroll_kafka_topics(environment, batch_size=batch_size, typed=True):
+                    writer.write_kafka_topic(environment, topic)
+            if containers:
+                async for parent, child, entity in self.crawl_containers(workers=workers):
+                    writer.write_edge(parent, child, entity.get('type'))
+        return writer.counts
+
+    async def iter_changed_datasets(
+        self,
+        checkpoint: Checkpoint,
+        field: str = 'lastOperationTime',
+        overlap: float = 300.0,
+        batch_size: int = 1000,
+        keep_alive: str = '5m',
+        projection: Projection = None,
+        typed: bool = False,
+    ) -> AsyncIterator[dict]:
+        key = 'datasets:' + field
+        started = now_millis()
+        since = checkpoint.get(key)
+        or_filters = None
+        if since is not None:
+            since = max(since - int(overlap * 1000), 0)
+            or_filters = [{'and': [{'field': field, 'condition': 'GREATER_THAN', 'values': [str(since)]}]}]
+        async for dataset in self.scroll_datasets(
+            batch_size=batch_size,
+            keep_alive=keep_alive,
+            projection=projection,
+            typed=typed,
+            or_filters=or_filters,
+            sort_field=field,
+        ):
+            yield dataset
+        checkpoint.set(key, started)
+
+    async def iter_changed_ingestion_sources(self, checkpoint: Checkpoint, page_size: int = 100) -> AsyncIterator[dict]:
+        known = checkpoint.get('ingestion_sources', {})
+        digests = {}
+        async for source in self._iter_ingestion_sources(page_size, use_cache=False):
+            digests[source['urn']] = digest(source)
+            if known.get(source['urn']) != digests[source['urn']]:
+                yield source
+        checkpoint.set('ingestion_sources', digests)
+
+    async def reconcile_ingestion_sources(
+        self,
+        desired_sources: List[dict],
+        chunk_size: int = 20,
+        workers: int = 4,
+        page_size: int = 100,
+        dry_run: bool = False,
+    ) -> ReconcileSummary:
+        sources = [source async for source in self._iter_ingestion_sources(page_size, workers, use_cache=False)]
+        return await self._reconcile_ingestion_sources(sources, desired_sources, chunk_size, workers, dry_run)
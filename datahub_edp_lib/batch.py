@@ -0,0 +1,133 @@
+"""
+Helpers for packing many lookups or mutations into aliased multi-field GraphQL documents.
+"""
+
+from typing import Callable, Dict, Iterable, List, Sequence
+
+from gql.transport.exceptions import TransportQueryError
+
+# Per-item cost of an aliased field on top of its variable values: alias, variable declaration, JSON keys
+ALIAS_OVERHEAD_BYTES = 48
+
+
+def chunked(
+    items: Iterable,
+    chunk_size: int,
+    max_payload_bytes: int,
+    size_of: Callable[[object], int] = len,
+) -> List[list]:
+    """
+    Split items into chunks limited both by count and by estimated payload size
+    :param items: Items to split
+    :param chunk_size: Maximum number of items in a chunk
+    :param max_payload_bytes: Maximum estimated request size of a chunk
+    :param size_of: Estimated size of the variable values of one item
+    :return: List of chunks
+    """
+    chunks, chunk, size = [], [], 0
+    for item in items:
+        cost = size_of(item) + ALIAS_OVERHEAD_BYTES
+        if chunk and (len(chunk) >= chunk_size or size + cost > max_payload_bytes):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(item)
+        size += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def aliased_lookup_query(operation: str, field: str, type_name: str, selection: str, size: int) -> str:
+    """
+    Build a query reading `size` entities of one type by urn, aliased e0..eN with variables $u0..$uN.
+    The text only depends on the chunk size, so the parsed document is cached once per size.
+    :param operation: Operation name
+    :param field: Query field taking an urn argument, for e.g. dataset
+    :param type_name: GraphQL type returned by the field, for e.g. Dataset
+    :param selection: Selection set of each entity, without braces
+    :param size: Number of entities
+    :return: Query source
+    """
+    declarations = ', '.join('$u%d: String!' % i for i in range(size))
+    fields = '\n'.join('e%d: %s(urn: $u%d) { ...entity }' % (i, field, i) for i in range(size))
+    return 'query %s(%s) {\n%s\n}\nfragment entity on %s {\n%s\n}' % (
+        operation,
+        declarations,
+        fields,
+        type_name,
+        selection,
+    )
+
+
+def aliased_mutation_query(operation: str, declaration: str, field: str, size: int) -> str:
+    """
+    Build a mutation of `size` aliased fields e0..eN.
+    Templates are %-formatted with the index of the item, for e.g. '$u%(i)d: String!'.
+    :param operation: Operation name
+    :param declaration: Variable declarations of one item
+    :param field: Mutation field of one item, without the alias
+    :param size: Number of items
+    :return: Mutation source
+    """
+    declarations = ', '.join(declaration % {'i': i} for i in range(size))
+    fields = '\n'.join('e%d: ' % i + field % {'i': i} for i in range(size))
+    return 'mutation %s(%s) {\n%s\n}' % (operation, declarations, fields)
+
+
+def aliased_data(result) -> dict:
+    """
+    Data of an aliased operation, keeping the aliases that succeeded when others failed
+    :param result: Operation result or the exception raised by it
+    :return: Response data
+    """
+    if isinstance(result, TransportQueryError) and result.data:
+        return result.data
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+def merge_aliased(chunks: Sequence[Sequence[str]], results: Sequence) -> dict:
+    """
+    Merge results of aliased lookups into a dict keyed by urn.
+    Entities that are missing or failed to resolve map to None.
+    :param chunks: Urns of every executed chunk
+    :param results: Result of every chunk
+    :return: Entities by urn
+    """
+    merged = {}
+    for chunk, result in zip(chunks, results):
+        data = aliased_data(result)
+        for i, urn in enumerate(chunk):
+            merged[urn] = data.get('e%d' % i)
+    return merged
+
+
+def merge_aliased_values(chunks: Sequence[Sequence[str]], results: Sequence) -> dict:
+    """
+    Merge results of aliased mutations into the returned value per key.
+    A failed mutation only fails its own key, a failed request fails every key of its chunk.
+    :param chunks: Keys of every executed chunk
+    :param results: Result of every chunk
+    :return: Returned value by key, None for the failed ones
+    """
+    merged = {}
+    for chunk, result in zip(chunks, results):
+        try:
+            data = aliased_data(result)
+        except Exception:
+            data = {}
+        for i, key in enumerate(chunk):
+            merged[key] = data.get('e%d' % i)
+    return merged
+
+
+def merge_aliased_status(chunks: Sequence[Sequence[str]], results: Sequence) -> Dict[str, bool]:
+    """
+    Merge results of aliased mutations into a success flag per key.
+    A failed mutation only fails its own key, a failed request fails every key of its chunk.
+    :param chunks: Keys of every executed chunk
+    :param results: Result of every chunk
+    :return: Success by key
+    """
+    return {key: bool(value) for key, value in merge_aliased_values(chunks, results).items()}
@@ -0,0 +1,121 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Set
+
+_MISSING = object()
+
+
+def collect_urns(value) -> Set[str]:
+    """
+    Collect every urn found in variables or in a response
+    :param value: Nested dicts, lists and scalars
+    :return: Set of urns
+    """
+    urns = set()
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, str) and item.startswith('urn:'):
+            urns.add(item)
+    return urns
+
+
+class ResponseCache:
+    """
+    Bounded response cache with TTL expiry and LRU eviction.
+    Every entry is indexed by the urns found in its variables and response, so a mutation
+    can drop exactly the entries that mention the entities it changed.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        """
+        :param maxsize: Maximum number of cached responses
+        :param ttl: Seconds a response stays valid
+        :param clock: Time source, monotonic clock by default
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._keys_by_urn: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        """
+        Get a copy of a cached response
+        :param key: Cache key
+        :param default: Returned when the key is missing or expired
+        :return: Cached response
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] <= self.clock():
+                self._remove(key)
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: Hashable, value, urns: Iterable[str] = ()):
+        """
+        Cache a response
+        :param key: Cache key
+        :param value: Response
+        :param urns: Urns the response depends on
+        """
+        urns = frozenset(urns)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self.clock() + self.ttl, copy.deepcopy(value), urns)
+            for urn in urns:
+                self._keys_by_urn.setdefault(urn, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, urns: Iterable[str]):
+        """
+        Drop every response that depends on any of the urns
+        :param urns: Changed urns
+        """
+        with self._lock:
+            for urn in urns:
+                for key in list(self._keys_by_urn.get(urn, ())):
+                    self._remove(key)
+
+    def clear(self):
+        """
+        Drop every response, the hit and miss counters are kept
+        """
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_urn.clear()
+
+    def stats(self) -> dict:
+        """
+        :return: Hit and miss counters and the current size
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _remove(self, key: Hashable):
+        _, _, urns = self._entries.pop(key)
+        for urn in urns:
+            keys = self._keys_by_urn.get(urn)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_urn[urn]
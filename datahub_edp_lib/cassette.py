@@ -0,0 +1,234 @@
+"""
+Record and replay of GMS exchanges, to run real workloads offline and compare client versions
+without a network. A cassette is a JSON Lines file with one recorded exchange per line:
+
+    {"kind": "cassette", "version": 1, "created": 1700000000.0}
+    {"kind": "exchange", "operation": "search_dataset_fields", "key": ..., "variables": {...},
+     "status": 200, "reason": "OK", "latency": 0.042, "response": {"data": ...}}
+
+Responses that are not JSON are kept as "text". Files ending with .gz are compressed with gzip.
+The access token is never recorded, values of secret-looking keys in variables and responses,
+ingestion recipes included, and every variable of mutations with a secret-looking name, for e.g.
+CreateSecret, are replaced with *** before they are written.
+"""
+
+import gzip
+import io
+import json
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List
+
+import requests
+from gql.transport import exceptions
+
+from datahub_edp_lib.checkpoint import digest
+
+CASSETTE_VERSION = 1
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+REDACTED = '***'
+
+# Keys whose values are never written to a cassette
+DEFAULT_SECRETS = r'password|passwd|secret|token|credential|api_?key|private_?key|authorization'
+
+
+class CassetteMissError(exceptions.TransportError):
+    """
+    Raised on replay when the cassette has no exchange for a request
+    """
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode) if path.endswith('.gz') else open(path, mode)
+
+
+def _operation_name(query: str) -> str:
+    match = re.match(r'\s*(?:query|mutation)\s+(\w+)', query)
+    return match.group(1) if match else 'anonymous'
+
+
+def _mutation_name(query: str) -> str:
+    """
+    :return: Operation name and first field of a mutation, for e.g. "CreateSecret createSecret", empty for queries
+    """
+    match = re.match(r'\s*mutation\b\s*(\w*)[^{]*\{\s*(?:\w+\s*:\s*)?(\w*)', query)
+    return ' '.join(match.groups()) if match else ''
+
+
+class Cassette:
+    """
+    Recorded GMS exchanges served back in place of the network.
+
+        with Cassette('workload.jsonl.gz', mode='record') as cassette:
+            DataHubGraphql(base_url, token, cassette=cassette).get_dataset_fields('*')
+
+        with Cassette('workload.jsonl.gz', latency_scale=0) as cassette:
+            DataHubGraphql(base_url, 'token', cassette=cassette).get_dataset_fields('*')
+
+    Requests are matched by the query text and the redacted variables. Repeated requests are served
+    the recorded exchanges in order, the last one is served again once they run out.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = REPLAY,
+        latency_scale: float = 1.0,
+        secrets: str = DEFAULT_SECRETS,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        :param path: Cassette file, gzip compressed when it ends with .gz
+        :param mode: "record" sends requests and writes them to the file on close, "replay" serves them from the file
+        :param latency_scale: Multiplier of the recorded latencies on replay, 0 serves exchanges at once
+        :param secrets: Regular expression matching the keys, case insensitive, whose values are redacted,
+            and the mutations whose variables are all redacted
+        :param sleep: Function waiting out a replayed latency
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError('Unknown cassette mode %r' % mode)
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.sleep = sleep
+        self.exchanges: List[dict] = []
+        self.misses = 0
+        self._secrets = re.compile(secrets, re.IGNORECASE)
+        self._queues: Dict[str, Deque[dict]] = {}
+        self._lock = threading.Lock()
+        if mode == REPLAY:
+            self.load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def load(self):
+        with _open(self.path, 'rb') as file:
+            for line in file:
+                record = json.loads(line)
+                if record['kind'] == 'exchange':
+                    self.exchanges.append(record)
+                    self._queues.setdefault(record['key'], deque()).append(record)
+
+    def close(self):
+        """
+        Write the recorded exchanges, nothing is written on replay
+        """
+        if self.mode == RECORD:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            exchanges = list(self.exchanges)
+        with _open(self.path, 'wb') as file:
+            header = {'kind': 'cassette', 'version': CASSETTE_VERSION, 'created': time.time()}
+            for record in [header] + exchanges:
+                file.write(json.dumps(record, ensure_ascii=False).encode() + b'\n')
+
+    def redact(self, value: Any) -> Any:
+        """
+        :param value: JSON value
+        :return: Copy of the value with secrets replaced, JSON documents in strings are redacted too
+        """
+        if isinstance(value, dict):
+            return {
+                key: REDACTED if self._secrets.search(key) and item is not None else self.redact(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [self.redact(item) for item in value]
+        if isinstance(value, str) and value[:1] in ('{', '['):
+            try:
+                document = json.loads(value)
+            except ValueError:
+                return value
+            redacted = self.redact(document)
+            return value if redacted == document else json.dumps(redacted)
+        return value
+
+    def redact_variables(self, query: str, variables: dict) -> dict:
+        """
+        :param query: GraphQL document source
+        :param variables: Operation variables
+        :return: Redacted copy of the variables, every one is redacted for mutations with a secret-looking name,
+            whose values, for e.g. the one of createSecret, are secrets under any key
+        """
+        if self._secrets.search(_mutation_name(query)):
+            return {key: REDACTED if value is not None else None for key, value in variables.items()}
+        return self.redact(variables)
+
+    def play(self, url: str, payload: dict, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Record the exchange of a request or serve it from the cassette
+        :param url: GraphQL endpoint, set on replayed responses
+        :param payload: Request body: query, variables and operation name
+        :param send: Function sending the request
+        :return: Response, its body is already read
+        """
+        variables = self.redact_variables(payload['query'], payload.get('variables') or {})
+        key = digest({'query': payload['query'], 'variables': variables})
+        if self.mode == RECORD:
+            return self._record(key, payload['query'], variables, send)
+
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                self.misses += 1
+                raise CassetteMissError(
+                    'No recorded exchange for %s in %s' % (_operation_name(payload['query']), self.path)
+                )
+            record = queue.popleft() if len(queue) > 1 else queue[0]
+        if self.latency_scale:
+            self.sleep(record['latency'] * self.latency_scale)
+        if 'response' in record:
+            body = json.dumps(record['response']).encode()
+        else:
+            body = record['text'].encode()
+        return _response(url, record['status'], record.get('reason'), body)
+
+    def _record(
+        self, key: str, query: str, variables: dict, send: Callable[[], requests.Response]
+    ) -> requests.Response:
+        started = time.perf_counter()
+        response = send()
+        # Reading the body here also times its transfer, streamed responses are parsed from the copy
+        body = response.content
+        latency = time.perf_counter() - started
+        response.raw = io.BytesIO(body)
+
+        record = {
+            'kind': 'exchange',
+            'operation': _operation_name(query),
+            'key': key,
+            'variables': variables,
+            'status': response.status_code,
+            'reason': response.reason,
+            'latency': round(latency, 6),
+        }
+        try:
+            record['response'] = self.redact(json.loads(body))
+        except ValueError:
+            record['text'] = body.decode('utf-8', 'replace')
+        with self._lock:
+            self.exchanges.append(record)
+        return response
+
+
+def _response(url: str, status: int, reason: str, body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.reason = reason
+    response.encoding = 'utf-8'
+    response.headers['Content-Type'] = 'application/json'
+    response._content = body
+    response.raw = io.BytesIO(body)
+    return response
@@ -0,0 +1,64 @@
+"""
+Checkpoints of incremental syncs, kept in a local JSON file.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict
+
+
+def now_millis() -> int:
+    return int(time.time() * 1000)
+
+
+def digest(value) -> str:
+    """
+    :param value: JSON serializable value
+    :return: Stable digest of the value, independent of the key order
+    """
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Checkpoint:
+    """
+    Named positions of change feeds, saved to a local JSON file.
+    One file can hold the positions of several feeds, every feed updates only its own key.
+
+        checkpoint = Checkpoint('datahub_sync.json')
+        for dataset in datahub.iter_changed_datasets(checkpoint):
+            ...
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Checkpoint file, created on the first save
+        """
+        self.path = path
+        self.positions: Dict[str, Any] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                self.positions = json.load(file)
+
+    def get(self, key: str, default=None):
+        return self.positions.get(key, default)
+
+    def set(self, key: str, value):
+        """
+        Update a position and save the file
+        :param key: Feed name
+        :param value: JSON serializable position
+        """
+        self.positions[key] = value
+        self.save()
+
+    def save(self):
+        """
+        Write the file atomically, a crash while saving keeps the previous positions
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        temporary = os.path.join(directory, '.%s.tmp' % os.path.basename(self.path))
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.positions, file, sort_keys=True, indent=2)
+        os.replace(temporary, self.path)
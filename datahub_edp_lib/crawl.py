@@ -0,0 +1,76 @@
+"""
+Bookkeeping of container hierarchy crawls, shared by the sync and async clients.
+"""
+
+import time
+from typing import Callable, List, Optional, Set, Tuple
+
+CONTAINER = 'CONTAINER'
+
+
+class CrawlStats:
+    """
+    Live counters of a crawl, updated while its edges are consumed.
+    Pass an instance to crawl_containers and read it from another thread or between edges.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        :param clock: Time source, monotonic clock by default
+        """
+        self.clock = clock
+        self.started = clock()
+        self.containers = 0
+        self.edges = 0
+        self.depth = 0
+
+    def __repr__(self):
+        return 'CrawlStats(containers=%d, edges=%d, depth=%d, %.1f containers/s, %.1f edges/s)' % (
+            self.containers,
+            self.edges,
+            self.depth,
+            self.containers_per_second,
+            self.edges_per_second,
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    @property
+    def containers_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.containers / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def edges_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.edges / elapsed if elapsed > 0 else 0.0
+
+
+def container_children(container: Optional[dict]) -> Tuple[int, List[dict]]:
+    """
+    :param container: Container entity with its first page of entities, None for a missing container
+    :return: (total, entities) of the page
+    """
+    page = (container or {}).get('entities') or {}
+    return page.get('total') or 0, [row['entity'] for row in page.get('searchResults') or ()]
+
+
+def child_edges(parent: str, entities: List[dict], visited: Set[str], frontier: List[str]) -> List[tuple]:
+    """
+    Build the edges of one expanded container and queue its unvisited child containers
+    :param parent: Urn of the expanded container
+    :param entities: Entities of the container
+    :param visited: Urns of the containers already queued, updated in place
+    :param frontier: Containers to expand on the next level, updated in place
+    :return: (parent urn, child urn, child entity) edges
+    """
+    edges = []
+    for entity in entities:
+        urn = entity['urn']
+        if entity.get('type') == CONTAINER and urn not in visited:
+            visited.add(urn)
+            frontier.append(urn)
+        edges.append((parent, urn, entity))
+    return edges
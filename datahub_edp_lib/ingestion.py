@@ -0,0 +1,159 @@
+"""
+Diffing of ingestion sources against their desired state, shared by the sync and async clients.
+
+A desired source has the shape of UpdateIngestionSourceInput, the recipe may be a JSON string or a dict:
+
+    {'name': 'postgres-orders', 'type': 'postgres', 'schedule': {'interval': '0 3 * * *', 'timezone': 'UTC'},
+     'config': {'recipe': {...}, 'executorId': 'default', 'version': None}}
+
+Missing keys keep the current values of an existing source; 'urn' selects the source to update,
+otherwise sources are matched by name.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Compared fields of UpdateIngestionSourceInput, the config ones are under "config"
+_FIELDS = ('name', 'type', 'schedule')
+_CONFIG_FIELDS = ('recipe', 'executorId', 'version')
+
+
+def recipe_value(recipe) -> Any:
+    """
+    :param recipe: Recipe as a JSON string or an already decoded value
+    :return: Decoded recipe, so that formatting and key order do not matter; text that is not JSON as is
+    """
+    if not isinstance(recipe, str):
+        return recipe
+    try:
+        return json.loads(recipe)
+    except ValueError:
+        return recipe.strip()
+
+
+def source_input(source: dict) -> dict:
+    """
+    :param source: Ingestion source of listIngestionSources
+    :return: Its UpdateIngestionSourceInput
+    """
+    schedule = source.get('schedule')
+    config = source.get('config') or {}
+    return {
+        'name': source.get('name'),
+        'type': source.get('type'),
+        'schedule': {'interval': schedule.get('interval'), 'timezone': schedule.get('timezone')} if schedule else None,
+        'config': {key: config.get(key) for key in _CONFIG_FIELDS},
+    }
+
+
+def desired_input(desired: dict, current: Optional[dict] = None) -> dict:
+    """
+    :param desired: Desired source
+    :param current: UpdateIngestionSourceInput of the existing source, None for a new one
+    :return: UpdateIngestionSourceInput to send, with the recipe encoded as JSON
+    """
+    merged = dict(current or {})
+    merged.update((key, value) for key, value in desired.items() if key not in ('urn', 'config'))
+    config = dict(merged.get('config') or {})
+    config.update(desired.get('config') or {})
+    if not isinstance(config.get('recipe'), str) and config.get('recipe') is not None:
+        config['recipe'] = json.dumps(config['recipe'])
+    merged['config'] = config
+    return merged
+
+
+def changed_fields(current: dict, desired: dict) -> List[str]:
+    """
+    :param current: UpdateIngestionSourceInput of the existing source
+    :param desired: UpdateIngestionSourceInput to send
+    :return: Fields that differ, for e.g. ["schedule", "config.recipe"]; recipes are compared as decoded JSON
+    """
+    changed = [field for field in _FIELDS if current.get(field) != desired.get(field)]
+    current_config, desired_config = current.get('config') or {}, desired.get('config') or {}
+    for field in _CONFIG_FIELDS:
+        before, after = current_config.get(field), desired_config.get(field)
+        if field == 'recipe':
+            before, after = recipe_value(before), recipe_value(after)
+        if before != after:
+            changed.append('config.' + field)
+    return changed
+
+
+class ReconcileSummary:
+    """
+    Outcome of reconcile_ingestion_sources
+    """
+
+    def __init__(self, dry_run: bool = False):
+        """
+        :param dry_run: Whether the changes were only planned
+        """
+        self.dry_run = dry_run
+        # Name -> urn of the created sources, None until they are created
+        self.created: Dict[str, Optional[str]] = {}
+        # Urn -> changed fields of the updated sources
+        self.updated: Dict[str, List[str]] = {}
+        # Urns of the sources already in the desired state
+        self.unchanged: List[str] = []
+        # Urn, name or "desired_sources[i]" -> reason of the sources that failed or could not be matched
+        self.failed: Dict[str, str] = {}
+
+    def __repr__(self):
+        return 'ReconcileSummary(created=%d, updated=%d, unchanged=%d, failed=%d%s)' % (
+            len(self.created),
+            len(self.updated),
+            len(self.unchanged),
+            len(self.failed),
+            ', dry_run' if self.dry_run else '',
+        )
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.updated)
+
+
+def plan(
+    sources: List[dict], desired_sources: List[dict], dry_run: bool = False
+) -> Tuple[ReconcileSummary, Dict[str, dict], Dict[str, dict]]:
+    """
+    Compare existing sources with the desired ones
+    :param sources: Every ingestion source of listIngestionSources
+    :param desired_sources: Desired sources
+    :param dry_run: Recorded in the summary
+    :return: (summary without the outcome of the mutations, inputs to create by name, inputs to update by urn)
+    """
+    summary = ReconcileSummary(dry_run)
+    by_urn = {source['urn']: source for source in sources}
+    by_name: Dict[str, List[dict]] = {}
+    for source in sources:
+        by_name.setdefault(source.get('name'), []).append(source)
+
+    creates: Dict[str, dict] = {}
+    updates: Dict[str, dict] = {}
+    for position, desired in enumerate(desired_sources):
+        if not desired.get('urn') and not desired.get('name'):
+            summary.failed['desired_sources[%d]' % position] = 'Neither urn nor name is given'
+            continue
+        if desired.get('urn'):
+            if desired['urn'] not in by_urn:
+                summary.failed[desired['urn']] = 'No ingestion source with this urn'
+                continue
+            matches = [by_urn[desired['urn']]]
+        else:
+            matches = by_name.get(desired.get('name'), [])
+        if len(matches) > 1:
+            summary.failed[desired['name']] = 'Several ingestion sources have this name, pass the urn'
+        elif not matches:
+            creates[desired['name']] = desired_input(desired)
+            summary.created[desired['name']] = None
+        else:
+            urn = matches[0]['urn']
+            current = source_input(matches[0])
+            update = desired_input(desired, current)
+            changed = changed_fields(current, update)
+            if changed:
+                updates[urn] = update
+                summary.updated[urn] = changed
+            else:
+                summary.unchanged.append(urn)
+    return summary, creates, updates
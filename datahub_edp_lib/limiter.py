@@ -0,0 +1,192 @@
+"""
+Client-side rate limiting and adaptive concurrency for GMS calls.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Optional
+
+import aiohttp
+import requests
+from gql.transport import exceptions
+
+# HTTP statuses GMS answers with when it is overloaded
+OVERLOAD_STATUSES = frozenset((429, 502, 503, 504))
+
+# Polling interval of async waiters while every concurrency slot is taken
+_ASYNC_POLL_SECONDS = 0.005
+
+
+def is_overload(error: BaseException) -> bool:
+    """
+    :param error: Exception raised by an operation
+    :return: Whether the error means that the server is overloaded rather than the request is wrong
+    """
+    if isinstance(error, exceptions.TransportServerError):
+        return error.code in OVERLOAD_STATUSES
+    return isinstance(
+        error, (requests.Timeout, requests.ConnectionError, asyncio.TimeoutError, aiohttp.ClientConnectionError)
+    )
+
+
+class RateLimiter:
+    """
+    Token bucket limiting requests per second combined with AIMD adaptive concurrency.
+    The concurrency limit grows by one per window of successful requests and is cut by
+    `backoff` on overload errors or when the smoothed latency exceeds `latency_tolerance`
+    times the baseline (long-term average) latency; at most one cut happens per latency window.
+
+        datahub = DataHubGraphql(base_url, token, limiter=RateLimiter(rate=50, max_concurrency=32))
+    """
+
+    def __init__(
+        self,
+        rate: float = None,
+        burst: int = None,
+        min_concurrency: int = 1,
+        max_concurrency: int = 32,
+        initial_concurrency: int = 4,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param rate: Requests per second, None for no rate limit
+        :param burst: Requests allowed at once above the rate, defaults to one second of requests
+        :param min_concurrency: Lowest concurrency limit
+        :param max_concurrency: Highest concurrency limit
+        :param initial_concurrency: Concurrency limit to start with
+        :param backoff: Multiplier applied to the concurrency limit on congestion
+        :param latency_tolerance: Ratio of smoothed to baseline latency treated as congestion
+        :param clock: Time source, monotonic clock by default
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate or 1))
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.clock = clock
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.throttled = 0
+        self.decreases = 0
+        self._tokens = float(self.burst)
+        self._refilled = clock()
+        self._decreased = float('-inf')
+        self._condition = threading.Condition()
+
+    def stats(self) -> dict:
+        """
+        :return: Current concurrency limit, requests in flight, latencies in seconds and the number of waits
+        """
+        with self._condition:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'latency': self.latency,
+                'baseline': self.baseline,
+                'throttled': self.throttled,
+                'decreases': self.decreases,
+            }
+
+    def acquire(self):
+        """
+        Block until a request may be sent, pair with release()
+        """
+        with self._condition:
+            wait = self._try_acquire()
+            if wait != 0:
+                self.throttled += 1
+            while wait != 0:
+                self._condition.wait(wait)
+                wait = self._try_acquire()
+
+    async def acquire_async(self):
+        """
+        Wait without blocking the event loop until a request may be sent, pair with release()
+        """
+        with self._condition:
+            wait = self._try_acquire()
+            if wait != 0:
+                self.throttled += 1
+        while wait != 0:
+            await asyncio.sleep(_ASYNC_POLL_SECONDS if wait is None else wait)
+            with self._condition:
+                wait = self._try_acquire()
+
+    def release(self, latency: float, error: BaseException = None):
+        """
+        Report a finished request and adapt the concurrency limit
+        :param latency: Seconds the request took
+        :param error: Exception raised by the request
+        """
+        with self._condition:
+            self.in_flight -= 1
+            overloaded = error is not None and is_overload(error)
+            if not overloaded:
+                if self.latency is None:
+                    self.latency = self.baseline = latency
+                # A short average reacts to a latency jump before the long one, the baseline, catches up
+                self.latency += (latency - self.latency) * 0.2
+                self.baseline += (latency - self.baseline) * 0.02
+            congested = overloaded or (
+                self.latency is not None and self.latency > self.baseline * self.latency_tolerance
+            )
+            now = self.clock()
+            if congested and now - self._decreased >= (self.latency or 0):
+                self.limit = max(self.min_concurrency, self.limit * self.backoff)
+                self._decreased = now
+                self.decreases += 1
+            elif not congested:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a request slot for the block, its duration and exception feed the concurrency limit
+        """
+        self.acquire()
+        started = self.clock()
+        try:
+            yield
+        except BaseException as error:
+            self.release(self.clock() - started, error)
+            raise
+        self.release(self.clock() - started)
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """
+        Async counterpart of slot()
+        """
+        await self.acquire_async()
+        started = self.clock()
+        try:
+            yield
+        except BaseException as error:
+            self.release(self.clock() - started, error)
+            raise
+        self.release(self.clock() - started)
+
+    def _try_acquire(self) -> Optional[float]:
+        """
+        Take a concurrency slot and a token when both are available, the condition must be held
+        :return: 0 when acquired, seconds until a token is available, None while every slot is taken
+        """
+        if self.in_flight >= int(self.limit):
+            return None
+        if self.rate is not None:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self.in_flight += 1
+        return 0
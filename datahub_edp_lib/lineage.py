@@ -0,0 +1,114 @@
+"""
+Bookkeeping of multi-hop lineage traversals, shared by the sync and async clients.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Set, Tuple
+
+UPSTREAM = 'UPSTREAM'
+DOWNSTREAM = 'DOWNSTREAM'
+
+# (urn, type) of a neighbour of an entity in one direction
+Neighbour = Tuple[str, str]
+
+
+def check_direction(direction: str) -> str:
+    """
+    :param direction: LineageDirection, inlined into queries
+    :return: The direction
+    """
+    if direction not in (UPSTREAM, DOWNSTREAM):
+        raise ValueError('Lineage direction must be %s or %s, got %r' % (UPSTREAM, DOWNSTREAM, direction))
+    return direction
+
+
+def entity_lineage(entity: Optional[dict]) -> Tuple[int, List[dict]]:
+    """
+    :param entity: Entity with its first page of lineage, None for a missing entity
+    :return: (total, neighbour entities) of the page
+    """
+    page = (entity or {}).get('lineage') or {}
+    relationships = page.get('relationships') or ()
+    return page.get('total') or 0, [row['entity'] for row in relationships if row.get('entity')]
+
+
+class LineageCache:
+    """
+    Neighbours of expanded entities by direction, reused by later traversals until `ttl` expires,
+    the least recently used ones are evicted beyond `maxsize` entities
+    """
+
+    def __init__(
+        self, maxsize: int = 100000, ttl: Optional[float] = 600.0, clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        :param maxsize: Maximum number of expanded entities kept
+        :param ttl: Seconds the neighbours of an entity are reused, None to keep them until evicted or clear()
+        :param clock: Time source, monotonic clock by default
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._neighbours: 'OrderedDict[Tuple[str, str], Tuple[float, Tuple[Neighbour, ...]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._neighbours)
+
+    def get(self, direction: str, urn: str) -> Optional[Tuple[Neighbour, ...]]:
+        with self._lock:
+            key = (direction, urn)
+            entry = self._neighbours.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[0] >= self.ttl:
+                del self._neighbours[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._neighbours.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, direction: str, urn: str, entities: List[dict]) -> Tuple[Neighbour, ...]:
+        """
+        :param direction: LineageDirection
+        :param urn: Expanded entity
+        :param entities: Every neighbour entity of the expanded one in the direction
+        :return: Neighbours
+        """
+        neighbours = tuple((entity['urn'], entity.get('type')) for entity in entities)
+        with self._lock:
+            self._neighbours[direction, urn] = (self.clock(), neighbours)
+            self._neighbours.move_to_end((direction, urn))
+            while len(self._neighbours) > self.maxsize:
+                self._neighbours.popitem(last=False)
+        return neighbours
+
+    def clear(self):
+        with self._lock:
+            self._neighbours.clear()
+
+
+def lineage_edges(
+    urn: str, neighbours: Tuple[Neighbour, ...], hops: int, visited: Set[str], frontier: List[str]
+) -> List[Tuple[str, str, str, int]]:
+    """
+    Build the edges of one expanded entity and queue its unvisited neighbours
+    :param urn: Urn of the expanded entity
+    :param neighbours: Neighbours of the entity
+    :param hops: Distance of the neighbours from the roots
+    :param visited: Urns of the entities already queued, updated in place
+    :param frontier: Entities to expand on the next hop, updated in place
+    :return: (urn, neighbour urn, neighbour type, hops) edges
+    """
+    edges = []
+    for neighbour, entity_type in neighbours:
+        if neighbour not in visited:
+            visited.add(neighbour)
+            frontier.append(neighbour)
+        edges.append((urn, neighbour, entity_type, hops))
+    return edges
@@ -0,0 +1,247 @@
+"""
+Per-operation instrumentation of GMS calls.
+Clients call every hook with an OperationEvent after each operation; Metrics aggregates the events
+and renders them in the Prometheus text format, OpenTelemetryHook forwards them to an OpenTelemetry meter.
+"""
+
+import bisect
+import threading
+from typing import Dict, Optional, Sequence
+
+# Latency histogram buckets in seconds, the Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# Lists counted as rows of a response
+_ROW_LISTS = ('searchResults', 'ingestionSources')
+
+
+def count_rows(data) -> int:
+    """
+    :param data: Data of a GraphQL response
+    :return: Number of entities returned: search results and ingestion sources, one per other object field
+    """
+    rows = 0
+    for value in (data or {}).values():
+        if isinstance(value, list):
+            rows += len(value)
+        elif isinstance(value, dict):
+            lists = [value[key] for key in _ROW_LISTS if isinstance(value.get(key), list)]
+            if lists:
+                rows += sum(len(items) for items in lists)
+            elif isinstance(value.get('entities'), dict):
+                rows += count_rows({'entities': value['entities'].get('searchResults')})
+            else:
+                rows += 1
+        elif value is not None:
+            rows += 1
+    return rows
+
+
+class OperationEvent:
+    __slots__ = (
+        'operation',
+        'operation_type',
+        'latency',
+        'request_bytes',
+        'response_bytes',
+        'rows',
+        'error',
+        'cached',
+    )
+
+    def __init__(
+        self,
+        operation: str,
+        operation_type: str,
+        latency: float,
+        request_bytes: Optional[int] = None,
+        response_bytes: Optional[int] = None,
+        rows: int = 0,
+        error: BaseException = None,
+        cached: bool = False,
+    ):
+        """
+        :param operation: GraphQL operation name
+        :param operation_type: query or mutation
+        :param latency: Seconds the operation took, retries included
+        :param request_bytes: Size of the request body, None when it is unknown
+        :param response_bytes: Size of the response body, None when it is unknown
+        :param rows: Number of entities returned, see count_rows
+        :param error: Exception raised by the operation
+        :param cached: Whether the result was served from the response cache
+        """
+        self.operation = operation
+        self.operation_type = operation_type
+        self.latency = latency
+        self.request_bytes = request_bytes
+        self.response_bytes = response_bytes
+        self.rows = rows
+        self.error = error
+        self.cached = cached
+
+    def __repr__(self):
+        fields = ', '.join('%s=%r' % (name, getattr(self, name)) for name in self.__slots__)
+        return 'OperationEvent(%s)' % fields
+
+
+class _OperationStats:
+    __slots__ = ('calls', 'cached', 'errors', 'latency_sum', 'buckets', 'request_bytes', 'response_bytes', 'rows')
+
+    def __init__(self, size: int):
+        self.calls = 0
+        self.cached = 0
+        self.errors: Dict[str, int] = {}
+        self.latency_sum = 0.0
+        self.buckets = [0] * (size + 1)
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.rows = 0
+
+
+class Metrics:
+    """
+    Hook aggregating operation events by operation name.
+
+        metrics = Metrics()
+        datahub = DataHubGraphql(base_url, token, hooks=[metrics])
+        ...
+        print(metrics.to_prometheus())
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        :param buckets: Upper bounds of the latency histogram buckets in seconds
+        """
+        self.bucket_bounds = tuple(sorted(buckets))
+        self._operations: Dict[str, _OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: OperationEvent):
+        with self._lock:
+            stats = self._operations.get(event.operation)
+            if stats is None:
+                stats = self._operations[event.operation] = _OperationStats(len(self.bucket_bounds))
+            stats.calls += 1
+            stats.rows += event.rows
+            if event.cached:
+                stats.cached += 1
+                return
+            stats.latency_sum += event.latency
+            stats.buckets[bisect.bisect_left(self.bucket_bounds, event.latency)] += 1
+            stats.request_bytes += event.request_bytes or 0
+            stats.response_bytes += event.response_bytes or 0
+            if event.error is not None:
+                error_type = type(event.error).__name__
+                stats.errors[error_type] = stats.errors.get(error_type, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        :return: Aggregates by operation name, the histogram holds per-bucket (not cumulative) counts
+        """
+        with self._lock:
+            return {
+                operation: {
+                    'calls': stats.calls,
+                    'cached': stats.cached,
+                    'errors': dict(stats.errors),
+                    'latency_sum': stats.latency_sum,
+                    'latency_buckets': dict(zip(self.bucket_bounds + (float('inf'),), stats.buckets)),
+                    'request_bytes': stats.request_bytes,
+                    'response_bytes': stats.response_bytes,
+                    'rows': stats.rows,
+                }
+                for operation, stats in self._operations.items()
+            }
+
+    def to_prometheus(self, prefix: str = 'datahub_graphql') -> str:
+        """
+        :param prefix: Metric name prefix
+        :return: Metrics in the Prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name: str, metric_type: str, description: str):
+            lines.append('# HELP %s_%s %s' % (prefix, name, description))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, metric_type))
+
+        def sample(name: str, labels: Dict[str, str], value):
+            text = ','.join('%s="%s"' % (key, _escape(label)) for key, label in labels.items())
+            lines.append('%s_%s{%s} %s' % (prefix, name, text, _number(value)))
+
+        counters = (
+            ('calls_total', 'calls', 'Operations executed, cached ones included'),
+            ('cached_total', 'cached', 'Operations served from the response cache'),
+            ('request_bytes_total', 'request_bytes', 'Request body bytes sent'),
+            ('response_bytes_total', 'response_bytes', 'Response body bytes received'),
+            ('rows_total', 'rows', 'Entities returned'),
+        )
+        for name, key, description in counters:
+            family(name, 'counter', description)
+            for operation, stats in sorted(snapshot.items()):
+                sample(name, {'operation': operation}, stats[key])
+
+        family('errors_total', 'counter', 'Failed operations by error type')
+        for operation, stats in sorted(snapshot.items()):
+            for error_type, count in sorted(stats['errors'].items()):
+                sample('errors_total', {'operation': operation, 'error': error_type}, count)
+
+        family('latency_seconds', 'histogram', 'Latency of operations sent to GMS')
+        for operation, stats in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in stats['latency_buckets'].items():
+                cumulative += count
+                sample('latency_seconds_bucket', {'operation': operation, 'le': _number(bound)}, cumulative)
+            sample('latency_seconds_sum', {'operation': operation}, stats['latency_sum'])
+            sample('latency_seconds_count', {'operation': operation}, cumulative)
+        return '\n'.join(lines) + '\n'
+
+
+class OpenTelemetryHook:
+    """
+    Hook recording operation events with OpenTelemetry instruments of the given meter.
+    The opentelemetry packages are not a dependency, any meter of the OpenTelemetry metrics API works.
+
+        from opentelemetry import metrics
+        datahub = DataHubGraphql(base_url, token, hooks=[OpenTelemetryHook(metrics.get_meter('datahub'))])
+    """
+
+    def __init__(self, meter, prefix: str = 'datahub.graphql'):
+        """
+        :param meter: opentelemetry.metrics.Meter
+        :param prefix: Instrument name prefix
+        """
+        self.calls = meter.create_counter(prefix + '.calls', description='Operations executed')
+        self.errors = meter.create_counter(prefix + '.errors', description='Failed operations')
+        self.latency = meter.create_histogram(prefix + '.latency', unit='s', description='Latency of operations')
+        self.request_bytes = meter.create_counter(prefix + '.request_bytes', unit='By', description='Bytes sent')
+        self.response_bytes = meter.create_counter(prefix + '.response_bytes', unit='By', description='Bytes received')
+        self.rows = meter.create_counter(prefix + '.rows', description='Entities returned')
+
+    def __call__(self, event: OperationEvent):
+        attributes = {'operation': event.operation, 'cached': event.cached}
+        self.calls.add(1, attributes)
+        self.rows.add(event.rows, attributes)
+        if event.cached:
+            return
+        self.latency.record(event.latency, attributes)
+        if event.request_bytes is not None:
+            self.request_bytes.add(event.request_bytes, attributes)
+        if event.response_bytes is not None:
+            self.response_bytes.add(event.response_bytes, attributes)
+        if event.error is not None:
+            self.errors.add(1, dict(attributes, error=type(event.error).__name__))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,150 @@
+"""
+Compact records built from search responses, for holding large listings in memory.
+Repeated strings (types, tag urns and names) are interned, and field paths of a dataset are
+kept in one newline-joined string instead of a list of dicts.
+"""
+
+import sys
+from typing import Optional, Tuple
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+class _Record:
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join('%s=%r' % (name, getattr(self, name)) for name in self.__slots__)
+        return '%s(%s)' % (type(self).__name__, fields)
+
+
+class EntityRef(_Record):
+    __slots__ = ('urn', 'type')
+
+    def __init__(self, urn: str, entity_type: str = None):
+        self.urn = urn
+        self.type = _intern(entity_type)
+
+    @classmethod
+    def from_entity(cls, entity: dict) -> 'EntityRef':
+        return cls(entity['urn'], entity.get('type'))
+
+
+class TagRef(_Record):
+    __slots__ = ('urn', 'name')
+
+    def __init__(self, urn: str, name: str = None):
+        self.urn = _intern(urn)
+        self.name = _intern(name)
+
+    @classmethod
+    def from_associations(cls, tags: Optional[dict]) -> Tuple['TagRef', ...]:
+        """
+        :param tags: GlobalTags of an entity: {"tags": [{"tag": {"urn": ..., "name": ...}}]}
+        :return: Tags of the entity
+        """
+        associations = (tags or {}).get('tags') or ()
+        return tuple(cls(association['tag']['urn'], association['tag'].get('name')) for association in associations)
+
+
+class Dataset(_Record):
+    __slots__ = ('urn', 'type', 'name', 'description', 'fields', 'tags')
+
+    def __init__(
+        self,
+        urn: str,
+        entity_type: str = None,
+        name: str = None,
+        description: str = None,
+        fields: str = '',
+        tags: Tuple[TagRef, ...] = (),
+    ):
+        """
+        :param fields: Field paths joined with newlines, see field_paths
+        """
+        self.urn = urn
+        self.type = _intern(entity_type)
+        self.name = name
+        self.description = description
+        self.fields = fields
+        self.tags = tags
+
+    @property
+    def field_paths(self) -> Tuple[str, ...]:
+        return tuple(self.fields.split('\n')) if self.fields else ()
+
+    @classmethod
+    def from_entity(cls, entity: dict) -> 'Dataset':
+        schema = entity.get('schemaMetadata') or {}
+        return cls(
+            entity['urn'],
+            entity.get('type'),
+            (entity.get('properties') or {}).get('name') or entity.get('name'),
+            (entity.get('editableProperties') or {}).get('description'),
+            '\n'.join(field['fieldPath'] for field in schema.get('fields') or ()),
+            TagRef.from_associations(entity.get('tags')),
+        )
+
+
+class KafkaTopic(_Record):
+    __slots__ = ('urn', 'name', 'tags')
+
+    def __init__(self, urn: str, name: str = None, tags: Tuple[TagRef, ...] = ()):
+        self.urn = urn
+        self.name = name
+        self.tags = tags
+
+    @classmethod
+    def from_entity(cls, entity: dict) -> 'KafkaTopic':
+        return cls(
+            entity['urn'],
+            (entity.get('properties') or {}).get('name') or entity.get('name'),
+            TagRef.from_associations(entity.get('tags')),
+        )
+
+
+class IngestionSource(_Record):
+    __slots__ = ('urn', 'name', 'type', 'platform', 'interval', 'timezone', 'executor_id', 'version', 'recipe')
+
+    def __init__(
+        self,
+        urn: str,
+        name: str = None,
+        source_type: str = None,
+        platform: str = None,
+        interval: str = None,
+        timezone: str = None,
+        executor_id: str = None,
+        version: str = None,
+        recipe: str = None,
+    ):
+        self.urn = urn
+        self.name = name
+        self.type = _intern(source_type)
+        self.platform = _intern(platform)
+        self.interval = interval
+        self.timezone = _intern(timezone)
+        self.executor_id = _intern(executor_id)
+        self.version = version
+        self.recipe = recipe
+
+    @classmethod
+    def from_entity(cls, source: dict) -> 'IngestionSource':
+        schedule = source.get('schedule') or {}
+        config = source.get('config') or {}
+        return cls(
+            source['urn'],
+            source.get('name'),
+            source.get('type'),
+            (source.get('platform') or {}).get('name'),
+            schedule.get('interval'),
+            schedule.get('timezone'),
+            config.get('executorId'),
+            config.get('version'),
+            config.get('recipe'),
+        )
@@ -0,0 +1,93 @@
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+from graphql import InlineFragmentNode, Visitor, parse, print_ast, visit
+
+# Named sub-selections callers can pick by name, any other string is used as a raw selection
+SELECTIONS: Dict[str, Dict[str, str]] = {
+    'Dataset': {
+        'name': 'name',
+        'display_name': 'properties { name }',
+        'description': 'editableProperties { description }',
+        'fields': 'schemaMetadata { fields { fieldPath } }',
+        'tags': 'tags { tags { tag { urn name } associatedUrn } }',
+        'custom_properties': 'properties { customProperties { key value associatedUrn } }',
+        'platform': 'platform { name }',
+    },
+    'Container': {
+        'name': 'properties { name }',
+        'description': 'editableProperties { description }',
+        'platform': 'platform { name }',
+    },
+}
+
+
+class Projection:
+    """
+    Sub-selection of an entity type to request instead of the full default one.
+
+        Projection()                                # urn only
+        Projection('name', 'tags')                  # named selections from SELECTIONS
+        Projection('...columns', fragments=['fragment columns on Dataset { schemaMetadata { name } }'])
+    """
+
+    def __init__(self, *fields: str, on: str = 'Dataset', fragments: Sequence[str] = ()):
+        """
+        :param fields: Names from SELECTIONS or raw GraphQL selections, including fragment spreads
+        :param on: GraphQL type of the entity
+        :param fragments: Fragment definitions used by the raw selections
+        """
+        self.fields = tuple(fields)
+        self.on = on
+        self.fragments = tuple(fragments)
+
+    def __eq__(self, other):
+        return isinstance(other, Projection) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return 'Projection(%s, on=%r)' % (', '.join(map(repr, self.fields)), self.on)
+
+    def selections(self) -> List[str]:
+        """
+        :return: GraphQL selections of the projection, urn is always requested
+        """
+        named = SELECTIONS.get(self.on, {})
+        return ['urn'] + [named.get(field, field) for field in self.fields]
+
+    def _key(self):
+        return self.fields, self.on, self.fragments
+
+
+@lru_cache(maxsize=256)
+def _project(query: str, projection: Projection) -> str:
+    selection_set = parse('{ %s }' % ' '.join(projection.selections())).definitions[0].selection_set
+
+    class ReplaceSelection(Visitor):
+        def enter_inline_fragment(self, node, *_):
+            if node.type_condition is not None and node.type_condition.name.value == projection.on:
+                return InlineFragmentNode(
+                    type_condition=node.type_condition,
+                    directives=node.directives,
+                    selection_set=selection_set,
+                )
+            return None
+
+    projected = print_ast(visit(parse(query), ReplaceSelection()))
+    return '\n'.join((projected,) + projection.fragments)
+
+
+def project(query: str, projection: Projection = None) -> str:
+    """
+    Rewrite a query so the entities of the projection's type only request its selections.
+    The `... on <Type>` inline fragments of the query get the projected selection set; the rewritten
+    text is cached per query and projection, and its parsed document by the client.
+    :param query: GraphQL document source
+    :param projection: Projection to apply, None keeps the query as is
+    :return: Projected document source
+    """
+    if projection is None:
+        return query
+    return _project(query, projection)
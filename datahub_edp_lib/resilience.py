@@ -0,0 +1,140 @@
+"""
+Retry policies and a circuit breaker for GMS calls.
+"""
+
+import threading
+import time
+from typing import Callable, Dict
+
+import backoff
+from gql.transport import exceptions
+
+from datahub_edp_lib.limiter import is_overload
+
+# Operation classes a client picks a retry policy by
+QUERY = 'query'
+IDEMPOTENT_MUTATION = 'idempotent_mutation'
+MUTATION = 'mutation'
+
+
+class CircuitOpenError(exceptions.TransportError):
+    """
+    Raised without calling GMS while the circuit breaker is open
+    """
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for transient errors: 429/502/503/504 responses, timeouts and
+    connection errors. Other errors, for e.g. GraphQL errors of a wrong request, are raised at once.
+    """
+
+    def __init__(
+        self,
+        max_tries: int = 5,
+        max_time: float = 60.0,
+        initial_delay: float = 0.5,
+        multiplier: float = 2.0,
+        max_delay: float = 10.0,
+        jitter: Callable[[float], float] = backoff.full_jitter,
+        retry_on: Callable[[BaseException], bool] = is_overload,
+    ):
+        """
+        :param max_tries: Maximum number of attempts, the first one included
+        :param max_time: Seconds after which no more attempts are made
+        :param initial_delay: Delay before the first retry, before jitter
+        :param multiplier: Growth of the delay between retries
+        :param max_delay: Upper bound of a delay, before jitter
+        :param jitter: Function randomizing a delay, None for exact delays
+        :param retry_on: Whether an error is transient and the call may be retried
+        """
+        self.max_tries = max_tries
+        self.max_time = max_time
+        self.initial_delay = initial_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_on = retry_on
+
+    def decorate(self, func: Callable) -> Callable:
+        """
+        :param func: Function or coroutine function to retry
+        :return: Retrying function, coroutine functions sleep without blocking the event loop
+        """
+        return backoff.on_exception(
+            backoff.expo,
+            Exception,
+            max_tries=self.max_tries,
+            max_time=self.max_time,
+            giveup=lambda error: not self.retry_on(error),
+            jitter=self.jitter,
+            base=self.multiplier,
+            factor=self.initial_delay,
+            max_value=self.max_delay,
+        )(func)
+
+
+def default_retry_policies() -> Dict[str, RetryPolicy]:
+    """
+    :return: Retry policies by operation class: reads and idempotent mutations are retried, other mutations are not
+    """
+    return {QUERY: RetryPolicy(), IDEMPOTENT_MUTATION: RetryPolicy(max_tries=3)}
+
+
+class CircuitBreaker:
+    """
+    Fail fast while GMS is down instead of waiting for every call to time out.
+    After `failure_threshold` consecutive transient errors the circuit opens and calls raise
+    CircuitOpenError. Once `reset_timeout` seconds pass a single trial call is let through:
+    its success closes the circuit, its failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        :param failure_threshold: Consecutive transient errors opening the circuit
+        :param reset_timeout: Seconds the circuit stays open before a trial call
+        :param clock: Time source, monotonic clock by default
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError unless a call may be made
+        """
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self._opened >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._trial):
+                raise CircuitOpenError('GMS circuit is open after %d consecutive failures' % self.failures)
+            if self.state == self.HALF_OPEN:
+                self._trial = True
+
+    def record(self, error: BaseException = None):
+        """
+        Report the outcome of a call let through by before_call
+        :param error: Exception raised by the call, None on success
+        """
+        with self._lock:
+            if error is not None and is_overload(error):
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self.state = self.OPEN
+                    self._opened = self.clock()
+            else:
+                self.failures = 0
+                self.state = self.CLOSED
+            self._trial = False
@@ -0,0 +1,217 @@
+"""
+Local catalog snapshots: a JSON Lines file written by DataHubGraphql.export_snapshot and an
+in-memory indexed reader answering lookups offline.
+
+Every line is one record with a "kind":
+
+    {"kind": "snapshot", "version": 1, "created": 1700000000.0}
+    {"kind": "dataset", "urn": ..., "type": ..., "name": ..., "description": ..., "fields": [...], "tags": [...]}
+    {"kind": "kafka_topic", "environment": "PROD", "urn": ..., "name": ..., "tags": [[<urn>, <name>], ...]}
+    {"kind": "contains", "parent": <container urn>, "child": <entity urn>, "type": <entity type>}
+
+Files ending with .gz are compressed with gzip.
+"""
+
+import gzip
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from datahub_edp_lib.models import Dataset, KafkaTopic, TagRef
+from datahub_edp_lib.transport import json_codec
+
+SNAPSHOT_VERSION = 1
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode) if path.endswith('.gz') else open(path, mode)
+
+
+def _tags(tags: Tuple[TagRef, ...]) -> List[list]:
+    return [[tag.urn, tag.name] for tag in tags]
+
+
+class SnapshotWriter:
+    """
+    Append catalog records to a snapshot file.
+
+        with SnapshotWriter('catalog.jsonl.gz') as writer:
+            writer.write_dataset(dataset)
+    """
+
+    def __init__(self, path: str, fast_json: bool = True):
+        """
+        :param path: Snapshot file, overwritten; gzip compressed when it ends with .gz
+        :param fast_json: Encode records with orjson when it is installed
+        """
+        self.path = path
+        self.counts: Dict[str, int] = {}
+        self._dumps = json_codec(fast_json)[1]
+        self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self) -> 'SnapshotWriter':
+        self._file = _open(self.path, 'wb')
+        self._write({'kind': 'snapshot', 'version': SNAPSHOT_VERSION, 'created': time.time()})
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write_dataset(self, dataset: Dataset):
+        self._write(
+            {
+                'kind': 'dataset',
+                'urn': dataset.urn,
+                'type': dataset.type,
+                'name': dataset.name,
+                'description': dataset.description,
+                'fields': list(dataset.field_paths),
+                'tags': _tags(dataset.tags),
+            }
+        )
+
+    def write_kafka_topic(self, environment: str, topic: KafkaTopic):
+        self._write(
+            {
+                'kind': 'kafka_topic',
+                'environment': environment,
+                'urn': topic.urn,
+                'name': topic.name,
+                'tags': _tags(topic.tags),
+            }
+        )
+
+    def write_edge(self, parent: str, child: str, entity_type: str = None):
+        self._write({'kind': 'contains', 'parent': parent, 'child': child, 'type': entity_type})
+
+    def _write(self, record: dict):
+        self._file.write(self._dumps(record) + b'\n')
+        self.counts[record['kind']] = self.counts.get(record['kind'], 0) + 1
+
+
+class Snapshot:
+    """
+    Catalog snapshot loaded into memory with indexes by field path, tag, topic name and container.
+
+        snapshot = Snapshot.load('catalog.jsonl.gz')
+        snapshot.datasets_with_field('passenger_id')
+        snapshot.kafka_topics_with_tag('urn:li:tag:pii')
+    """
+
+    def __init__(self):
+        self.created: Optional[float] = None
+        self.datasets: Dict[str, Dataset] = {}
+        # (environment, topic name) -> topic
+        self.kafka_topics: Dict[Tuple[str, str], KafkaTopic] = {}
+        self._kafka_topics_by_urn: Dict[str, Tuple[str, KafkaTopic]] = {}
+        self._datasets_by_field: Dict[str, Set[str]] = {}
+        self._urns_by_tag: Dict[str, Set[str]] = {}
+        self._children: Dict[str, List[Tuple[str, str]]] = {}
+        self._parents: Dict[str, Set[str]] = {}
+
+    @classmethod
+    def load(cls, path: str, fast_json: bool = True) -> 'Snapshot':
+        """
+        :param path: Snapshot file written by SnapshotWriter
+        :param fast_json: Decode records with orjson when it is installed
+        :return: Indexed snapshot
+        """
+        loads = json_codec(fast_json)[0]
+        snapshot = cls()
+        with _open(path, 'rb') as file:
+            for line in file:
+                if line.strip():
+                    snapshot.add(loads(line))
+        return snapshot
+
+    def add(self, record: dict):
+        """
+        Index one snapshot record
+        :param record: Decoded line of a snapshot file
+        """
+        kind = record['kind']
+        if kind == 'dataset':
+            tags = tuple(TagRef(urn, name) for urn, name in record['tags'])
+            dataset = Dataset(
+                record['urn'], record['type'], record['name'], record['description'], '\n'.join(record['fields']), tags
+            )
+            self.datasets[dataset.urn] = dataset
+            for field_path in record['fields']:
+                self._datasets_by_field.setdefault(field_path, set()).add(dataset.urn)
+            self._index_tags(dataset.urn, tags)
+        elif kind == 'kafka_topic':
+            tags = tuple(TagRef(urn, name) for urn, name in record['tags'])
+            topic = KafkaTopic(record['urn'], record['name'], tags)
+            self.kafka_topics[record['environment'], topic.name] = topic
+            self._kafka_topics_by_urn[topic.urn] = record['environment'], topic
+            self._index_tags(topic.urn, tags)
+        elif kind == 'contains':
+            self._children.setdefault(record['parent'], []).append((record['child'], record['type']))
+            self._parents.setdefault(record['child'], set()).add(record['parent'])
+        elif kind == 'snapshot':
+            if record['version'] > SNAPSHOT_VERSION:
+                raise ValueError('Unsupported snapshot version %s' % record['version'])
+            self.created = record['created']
+
+    def dataset(self, urn: str) -> Optional[Dataset]:
+        return self.datasets.get(urn)
+
+    def datasets_with_field(self, field_path: str) -> List[Dataset]:
+        """
+        :param field_path: Exact field path, for e.g. passenger_id
+        :return: Datasets having the field
+        """
+        return [self.datasets[urn] for urn in sorted(self._datasets_by_field.get(field_path, ()))]
+
+    def datasets_with_tag(self, tag: str) -> List[Dataset]:
+        """
+        :param tag: Tag urn or name
+        :return: Datasets carrying the tag
+        """
+        return [self.datasets[urn] for urn in sorted(self._urns_by_tag.get(tag, ())) if urn in self.datasets]
+
+    def kafka_topic(self, name: str, environment: str = 'PROD') -> Optional[KafkaTopic]:
+        return self.kafka_topics.get((environment, name))
+
+    def kafka_topics_with_tag(self, tag: str, environment: str = None) -> List[KafkaTopic]:
+        """
+        :param tag: Tag urn or name
+        :param environment: FabricType to limit the topics to, all environments by default
+        :return: Kafka topics carrying the tag
+        """
+        topics = []
+        for urn in sorted(self._urns_by_tag.get(tag, ())):
+            topic_environment, topic = self._kafka_topics_by_urn.get(urn, (None, None))
+            if topic is not None and environment in (None, topic_environment):
+                topics.append(topic)
+        return topics
+
+    def children(self, container_urn: str) -> List[Tuple[str, str]]:
+        """
+        :param container_urn: Urn of a container
+        :return: (urn, type) of the container entities
+        """
+        return list(self._children.get(container_urn, ()))
+
+    def containers_of(self, urn: str) -> List[str]:
+        """
+        :param urn: Urn of an entity
+        :return: Urns of the containers holding the entity
+        """
+        return sorted(self._parents.get(urn, ()))
+
+    def iter_datasets(self) -> Iterator[Dataset]:
+        return iter(self.datasets.values())
+
+    def _index_tags(self, urn: str, tags: Tuple[TagRef, ...]):
+        for tag in tags:
+            for key in (tag.urn, tag.name):
+                if key is not None:
+                    self._urns_by_tag.setdefault(key, set()).add(urn)
@@ -0,0 +1,118 @@
+"""
+In-memory index of the kafka topics of an environment, answering name lookups without GMS calls.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from datahub_edp_lib.models import KafkaTopic, TagRef
+
+
+class KafkaTopicIndex:
+    """
+    Kafka topics of one environment by name, loaded by paging get_kafka_topics.
+    The index is reloaded when it is older than `ttl` seconds, and when a lookup misses unless
+    the last reload happened less than `miss_refresh_interval` seconds ago, so names that do not
+    exist cost at most one reload per interval.
+
+        index = datahub.kafka_topic_index('PROD', ttl=600)
+        urn = index.urn('orders.events')
+
+    Tags changed after a reload are seen after the next one. Reloads bypass the response cache of the client.
+    """
+
+    def __init__(
+        self,
+        datahub,
+        environment: str,
+        ttl: float = 300.0,
+        miss_refresh_interval: float = 30.0,
+        page_size: int = 100,
+        prefetch: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param datahub: DataHubGraphql client loading the topics
+        :param environment: FabricType (https://datahubproject.io/docs/graphql/enums/#fabrictype)
+        :param ttl: Seconds after which a lookup reloads the index, None to never expire it
+        :param miss_refresh_interval: Minimum seconds between reloads caused by lookups of unknown names
+        :param page_size: The number of topics requested per page
+        :param prefetch: The number of pages in flight
+        :param clock: Time source, monotonic clock by default
+        """
+        self.datahub = datahub
+        self.environment = environment
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.clock = clock
+        self.loaded: Optional[float] = None
+        self.reloads = 0
+        self._topics: Dict[str, KafkaTopic] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._fresh())
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __iter__(self) -> Iterator[KafkaTopic]:
+        return iter(list(self._fresh().values()))
+
+    def get(self, name: str) -> Optional[KafkaTopic]:
+        """
+        :param name: Topic name
+        :return: The topic, None when the environment has no topic of this name
+        """
+        topic = self._fresh().get(name)
+        if topic is None and self._may_reload_on_miss():
+            topic = self._reload(self.loaded).get(name)
+        return topic
+
+    def urn(self, name: str) -> Optional[str]:
+        topic = self.get(name)
+        return topic.urn if topic is not None else None
+
+    def tags(self, name: str) -> Tuple[TagRef, ...]:
+        topic = self.get(name)
+        return topic.tags if topic is not None else ()
+
+    def refresh(self) -> Dict[str, KafkaTopic]:
+        """
+        Reload every topic of the environment, lookups keep using the previous topics until it is done
+        :return: Topics by name
+        """
+        with self._lock:
+            return self._load()
+
+    def _reload(self, stale: Optional[float]) -> Dict[str, KafkaTopic]:
+        """
+        :param stale: Load time of the topics the caller found outdated, they are not reloaded again
+            when another thread has reloaded them meanwhile
+        """
+        with self._lock:
+            return self._load() if self.loaded == stale else self._topics
+
+    def _load(self) -> Dict[str, KafkaTopic]:
+        started = self.clock()
+        topics = {}
+        for topic in self.datahub.iter_kafka_topics(
+            self.environment, page_size=self.page_size, prefetch=self.prefetch, typed=True, use_cache=False
+        ):
+            topics[topic.name] = topic
+        self._topics = topics
+        self.loaded = started
+        self.reloads += 1
+        return topics
+
+    def _fresh(self) -> Dict[str, KafkaTopic]:
+        loaded = self.loaded
+        if loaded is None or (self.ttl is not None and self.clock() - loaded >= self.ttl):
+            return self._reload(loaded)
+        return self._topics
+
+    def _may_reload_on_miss(self) -> bool:
+        return self.loaded is None or self.clock() - self.loaded >= self.miss_refresh_interval
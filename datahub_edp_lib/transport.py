@@ -0,0 +1,213 @@
+import json
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import requests
+from gql.transport import exceptions
+from gql.transport.requests import RequestsHTTPTransport
+from graphql import DocumentNode, ExecutionResult, print_ast
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+_START_EVENTS = ('start_map', 'start_array')
+_END_EVENTS = ('end_map', 'end_array')
+
+
+def json_codec(fast: bool = True):
+    """
+    :param fast: Prefer orjson when it is installed
+    :return: (loads, dumps) pair, dumps returns bytes
+    """
+    if fast and orjson is not None:
+        return orjson.loads, orjson.dumps
+    return json.loads, lambda value: json.dumps(value).encode()
+
+
+def _build_value(events: Iterator, event: str, value) -> Any:
+    builder = ijson.ObjectBuilder()
+    builder.event(event, value)
+    depth = 1
+    for _, event, value in events:
+        builder.event(event, value)
+        if event in _START_EVENTS:
+            depth += 1
+        elif event in _END_EVENTS:
+            depth -= 1
+            if depth == 0:
+                break
+    return builder.value
+
+
+def _stream_items(events: Iterator, prefix: str) -> Iterator[Any]:
+    """
+    Yield the items of the array at prefix as soon as each one is parsed
+    :param events: ijson parse events of a GraphQL response
+    :param prefix: ijson prefix of the array, for e.g. data.search.searchResults
+    :return: Generator of items, raises TransportQueryError at the end if the response has errors
+    """
+    item_prefix = prefix + '.item'
+    errors = None
+    for current, event, value in events:
+        if current == item_prefix:
+            yield _build_value(events, event, value) if event in _START_EVENTS else value
+        elif current == 'errors' and event == 'start_array':
+            errors = _build_value(events, event, value)
+    if errors:
+        raise exceptions.TransportQueryError(str(errors[0]), errors=errors)
+
+
+class DataHubHTTPTransport(RequestsHTTPTransport):
+    """
+    Requests transport with a pluggable JSON codec and incremental response parsing.
+    The query text of a parsed document is sent as is instead of printing the AST on every call.
+    """
+
+    def __init__(self, url: str, fast_json: bool = True, cassette=None, **kwargs):
+        """
+        :param url: The GraphQL server URL
+        :param fast_json: Encode and decode JSON with orjson when it is installed
+        :param cassette: cassette.Cassette recording the exchanges or serving them instead of the server
+        :param kwargs: RequestsHTTPTransport arguments
+        """
+        super().__init__(url, **kwargs)
+        self.cassette = cassette
+        self.json_loads, self.json_dumps = json_codec(fast_json)
+        # Body sizes of the last request and response of the current thread, read by the client's hooks
+        self.exchange = threading.local()
+
+    def execute(  # type: ignore
+        self,
+        document: DocumentNode,
+        variable_values: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None,
+        timeout: Optional[int] = None,
+        extra_args: Dict[str, Any] = None,
+        upload_files: bool = False,
+    ) -> ExecutionResult:
+        if upload_files:
+            return super().execute(document, variable_values, operation_name, timeout, extra_args, upload_files)
+
+        response = self._post(document, variable_values, operation_name, timeout, extra_args)
+        self.exchange.response_bytes = len(response.content)
+        try:
+            result = self.json_loads(response.content)
+        except ValueError:
+            _raise_response_error(response, 'Not a JSON answer')
+        if not isinstance(result, dict) or ('errors' not in result and 'data' not in result):
+            _raise_response_error(response, 'No "data" or "errors" keys in answer')
+        return ExecutionResult(
+            errors=result.get('errors'),
+            data=result.get('data'),
+            extensions=result.get('extensions'),
+        )
+
+    def execute_stream(
+        self, document: DocumentNode, variable_values: Optional[Dict[str, Any]], path: str
+    ) -> Iterator[Any]:
+        """
+        Execute a query and yield the items of one array of its data while the body is still being read.
+        Without ijson installed the body is decoded at once and the items are yielded afterwards.
+        :param document: GraphQL query as AST Node object
+        :param variable_values: Dictionary of input parameters
+        :param path: Dotted path of the array in the data, for e.g. searchAcrossEntities.searchResults
+        :return: Generator of items
+        """
+        yield from self.iter_stream(self.post_stream(document, variable_values), path)
+
+    def post_stream(self, document: DocumentNode, variable_values: Optional[Dict[str, Any]]) -> requests.Response:
+        """
+        Send a query for execute_stream
+        :param document: GraphQL query as AST Node object
+        :param variable_values: Dictionary of input parameters
+        :return: Response with its headers received and its body not read yet
+        """
+        return self._post(document, variable_values, stream=True)
+
+    def iter_stream(self, response: requests.Response, path: str) -> Iterator[Any]:
+        """
+        Read the body of a post_stream response, yielding the items of one array of its data
+        :param response: Response of post_stream, closed once the items are read
+        :param path: Dotted path of the array in the data, for e.g. searchAcrossEntities.searchResults
+        :return: Generator of items
+        """
+        with response:
+            if response.status_code >= 400 or ijson is None:
+                yield from _items_at(response, self.json_loads, path)
+                return
+            response.raw.decode_content = True
+            yield from _stream_items(ijson.parse(response.raw, use_float=True), 'data.' + path)
+
+    def _post(
+        self,
+        document: DocumentNode,
+        variable_values: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None,
+        timeout: Optional[int] = None,
+        extra_args: Dict[str, Any] = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        if not self.session:
+            raise exceptions.TransportClosed('Transport is not connected')
+
+        payload: Dict[str, Any] = {'query': document.loc.source.body if document.loc else print_ast(document)}
+        if variable_values:
+            payload['variables'] = variable_values
+        if operation_name:
+            payload['operationName'] = operation_name
+
+        data = self.json_dumps(payload)
+        self.exchange.request_bytes = len(data)
+        self.exchange.response_bytes = None
+        post_args = {
+            'headers': {**(self.headers or {}), 'Content-Type': 'application/json'},
+            'auth': self.auth,
+            'cookies': self.cookies,
+            'timeout': timeout or self.default_timeout,
+            'verify': self.verify,
+            'data': data,
+            'stream': stream,
+        }
+        post_args.update(self.kwargs)
+        if extra_args:
+            post_args.update(extra_args)
+
+        if self.cassette is not None:
+            response = self.cassette.play(
+                self.url, payload, lambda: self.session.request(self.method, self.url, **post_args)
+            )
+        else:
+            response = self.session.request(self.method, self.url, **post_args)
+        self.response_headers = response.headers
+        return response
+
+
+def _items_at(response: requests.Response, json_loads: Callable[[bytes], Any], path: str) -> list:
+    try:
+        result = json_loads(response.content)
+    except ValueError:
+        _raise_response_error(response, 'Not a JSON answer')
+    if not isinstance(result, dict) or ('errors' not in result and 'data' not in result):
+        _raise_response_error(response, 'No "data" or "errors" keys in answer')
+    if result.get('errors'):
+        raise exceptions.TransportQueryError(str(result['errors'][0]), errors=result['errors'], data=result.get('data'))
+    items = result['data']
+    for key in path.split('.'):
+        items = items[key]
+    return items
+
+
+def _raise_response_error(response: requests.Response, reason: str):
+    # Same contract as RequestsHTTPTransport: TransportServerError for HTTP errors, TransportProtocolError otherwise
+    try:
+        response.raise_for_status()
+    except requests.HTTPError as error:
+        raise exceptions.TransportServerError(str(error), error.response.status_code) from error
+    raise exceptions.TransportProtocolError('Server did not return a GraphQL result: %s: %s' % (reason, response.text))
@@ -0,0 +1,157 @@
+"""
+Write-behind queue of tag mutations: operations are buffered, only the last one on a tag of a resource
+is kept and the rest is sent in as few batch mutations as possible.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+ADD = 'batchAddTags'
+REMOVE = 'batchRemoveTags'
+
+# (resource urn, field path or None, tag urn)
+_Key = Tuple[str, Optional[str], str]
+
+
+class MutationQueue:
+    """
+    Buffered tag mutations of a DataHubGraphql client. Pending operations are flushed once `max_pending`
+    of them are pending, `max_delay` seconds after the first of them, on flush() and on close() of the
+    queue or of the client. Every operation returns a future resolving to its success.
+
+        queue = datahub.write_behind(max_pending=500, max_delay=2.0)
+        future = queue.add_tag(tag_urn, dataset_urn)
+        ...
+        datahub.close()
+        future.result()
+
+    Pending operations on the same tag of the same resource coalesce: a repeated one shares the pending
+    request, an opposite one replaces the pending one, the last writer wins. The future of the replaced
+    operation resolves to True without a request, the new one when the replacing operation is sent.
+    """
+
+    def __init__(
+        self, datahub, max_pending: int = 1000, max_delay: float = 1.0, chunk_size: int = 100, workers: int = 4
+    ):
+        """
+        :param datahub: DataHubGraphql client sending the mutations
+        :param max_pending: Pending operations triggering a flush on the calling thread
+        :param max_delay: Seconds an operation may stay pending, flushed on a timer thread
+        :param chunk_size: The number of resources per batch mutation and of batch mutations per request
+        :param workers: The number of requests in flight during a flush
+        """
+        self.datahub = datahub
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.sent = 0
+        self.superseded = 0
+        self._pending: Dict[_Key, Tuple[str, List[Future]]] = {}
+        self._lock = threading.Lock()
+        # Flushes run one at a time, so an operation never overtakes an earlier one on the same tag
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add_tag(self, tag_urn: str, resource_urn: str) -> Future:
+        return self._submit(ADD, tag_urn, resource_urn)
+
+    def remove_tag(self, tag_urn: str, resource_urn: str) -> Future:
+        return self._submit(REMOVE, tag_urn, resource_urn)
+
+    def add_field_tag(self, tag_urn: str, resource_urn: str, subresource: str) -> Future:
+        return self._submit(ADD, tag_urn, resource_urn, subresource)
+
+    def remove_field_tag(self, tag_urn: str, resource_urn: str, subresource: str) -> Future:
+        return self._submit(REMOVE, tag_urn, resource_urn, subresource)
+
+    def flush(self) -> int:
+        """
+        Send the pending operations and resolve their futures
+        :return: Number of operations sent
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._cancel_timer()
+            for datahub_method in (ADD, REMOVE):
+                # Tags of every resource, resources sharing a tag set are then sent in one batch mutation
+                targets: Dict[Tuple[str, Optional[str]], Tuple[List[str], List[Future]]] = {}
+                for (resource_urn, subresource, tag_urn), (method, futures) in pending.items():
+                    if method == datahub_method:
+                        tag_urns, target_futures = targets.setdefault((resource_urn, subresource), ([], []))
+                        tag_urns.append(tag_urn)
+                        target_futures.extend(futures)
+                if targets:
+                    self._send(datahub_method, targets)
+            return sum(len(futures) for _, futures in pending.values())
+
+    def close(self):
+        """
+        Flush the pending operations
+        """
+        self.flush()
+
+    def _submit(self, datahub_method: str, tag_urn: str, resource_urn: str, subresource: str = None) -> Future:
+        future: Future = Future()
+        key = (resource_urn, subresource, tag_urn)
+        superseded: List[Future] = []
+        full = False
+        with self._lock:
+            method, futures = self._pending.get(key, (None, []))
+            if method == datahub_method:
+                futures.append(future)
+            elif method is not None:
+                # The resource ends up in the state of the last operation whatever it was before
+                self._pending[key] = (datahub_method, [future])
+                superseded = futures
+                self.superseded += len(superseded)
+            else:
+                self._pending[key] = (datahub_method, [future])
+                full = len(self._pending) >= self.max_pending
+                if self._timer is None and not full:
+                    self._timer = threading.Timer(self.max_delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        for superseded_future in superseded:
+            superseded_future.set_result(True)
+        if full:
+            self.flush()
+        return future
+
+    def _send(self, datahub_method: str, targets: Dict[Tuple[str, Optional[str]], Tuple[List[str], List[Future]]]):
+        resource_tags = []
+        for resource_urn, subresource in targets:
+            resource = {'resourceUrn': resource_urn}
+            if subresource is not None:
+                resource.update(subResourceType='DATASET_FIELD', subResource=subresource)
+            resource_tags.append((resource, targets[resource_urn, subresource][0]))
+        try:
+            succeeded = self.datahub._batch_add_or_remove_resource_tags(
+                resource_tags, datahub_method, self.chunk_size, self.workers
+            )
+        except Exception as error:
+            for _, futures in targets.values():
+                for future in futures:
+                    future.set_exception(error)
+            return
+        for ok, (_, futures) in zip(succeeded, targets.values()):
+            self.sent += len(futures)
+            for future in futures:
+                future.set_result(ok)
+
+    def _cancel_timer(self):
+        # The lock must be held
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
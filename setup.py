@@ -40,6 +40,12 @@ setup(
         "websockets==10.3",
         "yarl==1.8.1",
     ],
+    extras_require={
+        "fast": [
+            "ijson==3.1.4",
+            "orjson==3.8.3",
+        ],
+    },
     classifiers=[
         "Programming Language :: Python :: 3.11",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,34 @@
+from gql.transport.exceptions import TransportQueryError, TransportServerError
+
+from datahub_edp_lib import batch
+
+
+def test_chunked_limits_count_and_payload_size():
+    assert batch.chunked(range(5), 2, 10**6, size_of=lambda item: 0) == [[0, 1], [2, 3], [4]]
+    cost = batch.ALIAS_OVERHEAD_BYTES + 10
+    assert batch.chunked('abcd', 10, 2 * cost, size_of=lambda item: 10) == [['a', 'b'], ['c', 'd']]
+
+
+def test_chunked_keeps_an_oversized_item_alone():
+    assert batch.chunked(['big', 'x'], 10, 1, size_of=lambda item: 1000) == [['big'], ['x']]
+
+
+def test_aliased_lookup_query_declares_every_alias():
+    query = batch.aliased_lookup_query('get_tags', 'tag', 'Tag', 'urn', 2)
+    assert 'query get_tags($u0: String!, $u1: String!)' in query
+    assert 'e1: tag(urn: $u1) { ...entity }' in query
+    assert 'fragment entity on Tag' in query
+
+
+def test_merge_aliased_keeps_partial_data_of_failed_requests():
+    partial = TransportQueryError('Not found', data={'e0': {'urn': 'a'}, 'e1': None})
+    assert batch.merge_aliased([['a', 'b'], ['c']], [partial, {'e0': {'urn': 'c'}}]) == {
+        'a': {'urn': 'a'},
+        'b': None,
+        'c': {'urn': 'c'},
+    }
+
+
+def test_merge_aliased_status_fails_the_chunks_of_failed_requests():
+    results = [{'e0': True, 'e1': None}, TransportServerError('Bad Gateway', 502)]
+    assert batch.merge_aliased_status([['a', 'b'], ['c']], results) == {'a': True, 'b': False, 'c': False}
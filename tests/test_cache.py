@@ -0,0 +1,78 @@
+from datahub_edp_lib.cache import ResponseCache, collect_urns
+from datahub_edp_lib.lineage import DOWNSTREAM, UPSTREAM, LineageCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_collect_urns_walks_nested_values():
+    value = {'a': [{'urn': 'urn:li:dataset:1'}, 'urn:li:tag:t'], 'b': 'text', 'c': 1}
+    assert collect_urns(value) == {'urn:li:dataset:1', 'urn:li:tag:t'}
+
+
+def test_response_cache_returns_copies():
+    cache = ResponseCache()
+    cache.put('key', {'items': [1]})
+    cache.get('key')['items'].append(2)
+    assert cache.get('key') == {'items': [1]}
+    assert cache.stats() == {'hits': 2, 'misses': 0, 'size': 1}
+
+
+def test_response_cache_expires_entries():
+    clock = Clock()
+    cache = ResponseCache(ttl=10, clock=clock)
+    cache.put('key', 'value')
+    clock.now = 9.9
+    assert cache.get('key') == 'value'
+    clock.now = 10
+    assert cache.get('key', 'missing') == 'missing'
+    assert len(cache) == 0
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_response_cache_invalidates_entries_by_urn():
+    cache = ResponseCache()
+    cache.put('a', 1, ['urn:1', 'urn:2'])
+    cache.put('b', 2, ['urn:2'])
+    cache.put('c', 3, ['urn:3'])
+    cache.invalidate(['urn:2'])
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (None, None, 3)
+    cache.put('a', 4, ['urn:1'])
+    cache.invalidate(['urn:2'])
+    assert cache.get('a') == 4
+
+
+def test_lineage_cache_keeps_directions_apart_and_expires():
+    clock = Clock()
+    cache = LineageCache(ttl=10, clock=clock)
+    assert cache.put(UPSTREAM, 'urn:1', [{'urn': 'urn:0', 'type': 'DATASET'}]) == (('urn:0', 'DATASET'),)
+    assert cache.get(UPSTREAM, 'urn:1') == (('urn:0', 'DATASET'),)
+    assert cache.get(DOWNSTREAM, 'urn:1') is None
+    clock.now = 10
+    assert cache.get(UPSTREAM, 'urn:1') is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lineage_cache_evicts_least_recently_used():
+    cache = LineageCache(maxsize=2)
+    cache.put(UPSTREAM, 'urn:1', [])
+    cache.put(UPSTREAM, 'urn:2', [])
+    cache.get(UPSTREAM, 'urn:1')
+    cache.put(UPSTREAM, 'urn:3', [])
+    assert cache.get(UPSTREAM, 'urn:2') is None
+    assert cache.get(UPSTREAM, 'urn:1') == ()
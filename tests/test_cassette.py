@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from datahub_edp_lib.cassette import REDACTED, Cassette, CassetteMissError
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    return Cassette(str(tmp_path / 'exchanges.jsonl'), mode='record')
+
+
+def test_redact_replaces_secret_keys_at_any_depth(cassette):
+    value = {'name': 'pg', 'config': {'password': 'p', 'apiKey': 'k', 'empty_token': None}, 'items': [{'Token': 't'}]}
+    assert cassette.redact(value) == {
+        'name': 'pg',
+        'config': {'password': REDACTED, 'apiKey': REDACTED, 'empty_token': None},
+        'items': [{'Token': REDACTED}],
+    }
+
+
+def test_redact_reads_json_documents_in_strings(cassette):
+    recipe = json.dumps({'source': {'config': {'password': 'p', 'host_port': 'db'}}})
+    redacted = json.loads(cassette.redact({'recipe': recipe})['recipe'])
+    assert redacted == {'source': {'config': {'password': REDACTED, 'host_port': 'db'}}}
+    assert cassette.redact('{not json') == '{not json'
+
+
+def test_every_variable_of_secret_mutations_is_redacted(cassette):
+    query = 'mutation CreateSecret($name: String!, $value: String!) { createSecret(input: {name: $name}) }'
+    assert cassette.redact_variables(query, {'name': 'db', 'value': 's3cr3t'}) == {'name': REDACTED, 'value': REDACTED}
+    anonymous = 'mutation { createSecret(input: {name: "db", value: $value}) }'
+    assert cassette.redact_variables(anonymous, {'value': 's3cr3t'}) == {'value': REDACTED}
+    query = 'query getSecretless($value: String!) { tag(urn: $value) { urn } }'
+    assert cassette.redact_variables(query, {'value': 'urn:li:tag:t'}) == {'value': 'urn:li:tag:t'}
+
+
+def test_replay_without_a_recorded_exchange_raises(tmp_path):
+    path = str(tmp_path / 'empty.jsonl')
+    Cassette(path, mode='record').close()
+    with Cassette(path) as cassette, pytest.raises(CassetteMissError):
+        cassette.play('http://gms/api/graphql', {'query': 'query q { a }'}, send=None)
+    assert cassette.misses == 1
@@ -0,0 +1,67 @@
+import json
+
+from datahub_edp_lib import ingestion
+
+RECIPE = {'source': {'type': 'postgres', 'config': {'host_port': 'db:5432'}}, 'sink': {'type': 'datahub-rest'}}
+
+
+def _source(urn, name, recipe=RECIPE, interval='0 3 * * *'):
+    return {
+        'urn': urn,
+        'name': name,
+        'type': 'postgres',
+        'schedule': {'interval': interval, 'timezone': 'UTC'},
+        'platform': {'name': 'postgres'},
+        'config': {'recipe': json.dumps(recipe), 'executorId': 'default', 'version': None},
+    }
+
+
+def test_recipe_value_ignores_formatting_and_key_order():
+    assert ingestion.recipe_value('{"b": 1, "a": [1, 2]}') == ingestion.recipe_value('{ "a": [1,2], "b": 1 }')
+    assert ingestion.recipe_value(' not json ') == 'not json'
+    assert ingestion.recipe_value({'a': 1}) == {'a': 1}
+
+
+def test_plan_keeps_sources_in_the_desired_state():
+    sources = [_source('urn:1', 'orders')]
+    desired = [{'name': 'orders', 'config': {'recipe': json.dumps(RECIPE, indent=2, sort_keys=True)}}]
+    summary, creates, updates = ingestion.plan(sources, desired)
+    assert summary.unchanged == ['urn:1']
+    assert not creates and not updates
+    assert not summary.changed
+
+
+def test_plan_updates_only_changed_fields_and_keeps_missing_ones():
+    sources = [_source('urn:1', 'orders')]
+    desired = [{'name': 'orders', 'schedule': {'interval': '0 4 * * *', 'timezone': 'UTC'}}]
+    summary, creates, updates = ingestion.plan(sources, desired)
+    assert summary.updated == {'urn:1': ['schedule']}
+    assert json.loads(updates['urn:1']['config']['recipe']) == RECIPE
+    assert updates['urn:1']['type'] == 'postgres'
+    assert not creates
+
+
+def test_plan_creates_missing_sources_with_encoded_recipes():
+    summary, creates, updates = ingestion.plan(
+        [], [{'name': 'orders', 'type': 'postgres', 'config': {'recipe': RECIPE}}]
+    )
+    assert summary.created == {'orders': None}
+    assert json.loads(creates['orders']['config']['recipe']) == RECIPE
+    assert not updates
+
+
+def test_plan_matches_by_urn_before_name():
+    sources = [_source('urn:1', 'orders'), _source('urn:2', 'orders')]
+    desired = [{'urn': 'urn:2', 'name': 'orders', 'config': {'executorId': 'remote'}}]
+    summary, _, updates = ingestion.plan(sources, desired)
+    assert summary.updated == {'urn:2': ['config.executorId']}
+    assert list(updates) == ['urn:2']
+
+
+def test_plan_reports_unmatched_and_ambiguous_sources():
+    sources = [_source('urn:1', 'orders'), _source('urn:2', 'orders')]
+    desired = [{'name': 'orders'}, {'urn': 'urn:3'}, {'type': 'postgres'}]
+    summary, creates, updates = ingestion.plan(sources, desired, dry_run=True)
+    assert set(summary.failed) == {'orders', 'urn:3', 'desired_sources[2]'}
+    assert not creates and not updates
+    assert summary.dry_run
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+from gql.transport import exceptions
+
+from datahub_edp_lib.limiter import RateLimiter, is_overload
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_is_overload():
+    assert is_overload(exceptions.TransportServerError('Service Unavailable', 503))
+    assert not is_overload(exceptions.TransportServerError('Bad Request', 400))
+    assert not is_overload(ValueError())
+
+
+def test_limit_grows_additively_on_success():
+    limiter = RateLimiter(initial_concurrency=4, max_concurrency=5, clock=Clock())
+    limiter.acquire()
+    limiter.release(0.1)
+    assert limiter.limit == pytest.approx(4.25)
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(0.1)
+    assert limiter.limit == 5
+
+
+def test_limit_is_cut_on_overload_once_per_latency_window():
+    clock = Clock()
+    limiter = RateLimiter(initial_concurrency=16, min_concurrency=2, backoff=0.5, clock=clock)
+    limiter.acquire()
+    limiter.release(1.0)
+    error = exceptions.TransportServerError('Too Many Requests', 429)
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(1.0, error)
+    assert limiter.stats()['decreases'] == 1
+    clock.now = 1.0
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(1.0, error)
+        clock.now += 1.0
+    assert limiter.limit == 2
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_limit_is_cut_when_latency_rises_above_the_baseline():
+    clock = Clock()
+    limiter = RateLimiter(initial_concurrency=8, latency_tolerance=2.0, clock=clock)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(0.01)
+    before = limiter.limit
+    for _ in range(10):
+        clock.now += 1.0
+        limiter.acquire()
+        limiter.release(1.0)
+    assert limiter.limit < before
+    assert limiter.stats()['decreases'] >= 1
+
+
+def test_slot_blocks_while_every_slot_is_taken():
+    limiter = RateLimiter(min_concurrency=1, max_concurrency=1, initial_concurrency=1)
+    acquired = threading.Event()
+
+    def request():
+        with limiter.slot():
+            acquired.set()
+
+    with limiter.slot():
+        thread = threading.Thread(target=request)
+        thread.start()
+        assert not acquired.wait(0.05)
+    assert acquired.wait(1)
+    thread.join()
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_rate_limits_requests_per_second():
+    limiter = RateLimiter(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(3):
+        with limiter.slot():
+            pass
+    assert time.monotonic() - started >= 0.09
+    assert limiter.stats()['throttled'] == 2
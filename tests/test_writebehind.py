@@ -0,0 +1,72 @@
+from datahub_edp_lib.writebehind import ADD, REMOVE, MutationQueue
+
+
+class FakeDataHub:
+    def __init__(self):
+        self.calls = []
+
+    def _batch_add_or_remove_resource_tags(self, resource_tags, datahub_method, chunk_size, workers):
+        self.calls.append((datahub_method, resource_tags))
+        return [True] * len(resource_tags)
+
+
+def _queue(datahub, **options):
+    return MutationQueue(datahub, max_delay=60, **options)
+
+
+def test_operations_are_sent_on_flush_grouped_by_resource():
+    datahub = FakeDataHub()
+    with _queue(datahub) as queue:
+        first = queue.add_tag('urn:tag:a', 'urn:ds:1')
+        second = queue.add_tag('urn:tag:b', 'urn:ds:1')
+        field = queue.add_field_tag('urn:tag:a', 'urn:ds:1', 'column')
+        assert len(queue) == 3 and not datahub.calls
+    assert [call[0] for call in datahub.calls] == [ADD]
+    assert datahub.calls[0][1] == [
+        ({'resourceUrn': 'urn:ds:1'}, ['urn:tag:a', 'urn:tag:b']),
+        ({'resourceUrn': 'urn:ds:1', 'subResourceType': 'DATASET_FIELD', 'subResource': 'column'}, ['urn:tag:a']),
+    ]
+    assert first.result() and second.result() and field.result()
+    assert queue.sent == 3
+
+
+def test_repeated_operations_share_one_request():
+    datahub = FakeDataHub()
+    queue = _queue(datahub)
+    futures = [queue.add_tag('urn:tag:a', 'urn:ds:1') for _ in range(3)]
+    assert queue.flush() == 3
+    assert datahub.calls == [(ADD, [({'resourceUrn': 'urn:ds:1'}, ['urn:tag:a'])])]
+    assert all(future.result() for future in futures)
+
+
+def test_last_writer_wins():
+    datahub = FakeDataHub()
+    queue = _queue(datahub)
+    added = queue.add_tag('urn:tag:a', 'urn:ds:1')
+    removed = queue.remove_tag('urn:tag:a', 'urn:ds:1')
+    assert added.done() and added.result()
+    assert not removed.done()
+    queue.flush()
+    assert datahub.calls == [(REMOVE, [({'resourceUrn': 'urn:ds:1'}, ['urn:tag:a'])])]
+    assert removed.result()
+    assert queue.superseded == 1
+
+
+def test_max_pending_flushes_on_the_calling_thread():
+    datahub = FakeDataHub()
+    queue = _queue(datahub, max_pending=2)
+    queue.add_tag('urn:tag:a', 'urn:ds:1')
+    future = queue.add_tag('urn:tag:a', 'urn:ds:2')
+    assert future.done() and len(queue) == 0
+    assert len(datahub.calls) == 1
+
+
+def test_failed_send_fails_the_futures():
+    class FailingDataHub(FakeDataHub):
+        def _batch_add_or_remove_resource_tags(self, *args):
+            raise ConnectionError('GMS is down')
+
+    queue = _queue(FailingDataHub())
+    future = queue.add_tag('urn:tag:a', 'urn:ds:1')
+    queue.flush()
+    assert isinstance(future.exception(), ConnectionError)